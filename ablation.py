@@ -0,0 +1,153 @@
+import csv
+import time
+import numpy as np
+
+# Feature groups of the README, with the token features (columns 'FEATURE=value' or 'FEATURE') that belong to them
+FEATURE_GROUPS = {
+    'lemma': ['CURR_LEMMA', 'PREV_LEMMA', 'NEXT_LEMMA'],
+    'upos': ['UPOS', 'PREV_UPOS', 'NEXT_UPOS'],
+    'dependency_relation': ['DEPREL'],
+    'dependency_head': ['DEPENDENCY_HEAD_TOKEN'],
+    'dependency_path': ['DEPENDENCY_PATH'],
+    'dependency_distance': ['DEPENDENCY_DISTANCE'],
+    'voice': ['VOICE'],
+    'ner': ['NER'],
+    'predicate_distance': ['PRED_DISTANCE'],
+    'position': ['RELATIVE_POS'],
+    'embeddings': ['LEMMA_EMB', 'PREV_LEMMA_EMB', 'NEXT_LEMMA_EMB', 'PRED_EMB'],
+}
+
+
+def feature_group(feature_name):
+    """
+    Finds the feature group of a column of the feature matrix.
+
+    Parameters:
+    - feature_name (str): The name of the column, e.g. 'UPOS=NOUN', 'PRED_DISTANCE' or 'LEMMA_EMB_12'.
+
+    Returns:
+    - str: The name of the feature group, or 'other' for columns that do not belong to a known group.
+    """
+    feature = feature_name.split('=')[0]
+    for group, features in FEATURE_GROUPS.items():
+        # Embedding columns are numbered per dimension
+        if feature in features or feature.rsplit('_', 1)[0] in features:
+            return group
+    return 'other'
+
+
+def column_groups(feature_names):
+    """
+    Records which columns of the feature matrix belong to which feature group.
+
+    Parameters:
+    - feature_names (list of str): The name of every column of the feature matrix.
+
+    Returns:
+    - dict: The sorted column indices (numpy array) of every feature group that has columns.
+    """
+    columns = {}
+    for column, name in enumerate(feature_names):
+        columns.setdefault(feature_group(name), []).append(column)
+    return {group: np.array(group_columns, dtype=np.int64) for group, group_columns in columns.items()}
+
+
+def ablation_configurations(groups):
+    """
+    Lists the configurations of an ablation study: all features, every group left out, and every group on its own.
+
+    Parameters:
+    - groups (dict): The columns of every feature group, see column_groups.
+
+    Returns:
+    - list of tuple: The name and sorted columns of every configuration.
+    """
+    all_columns = np.sort(np.concatenate(list(groups.values())))
+    configurations = [('all', all_columns)]
+    for group, columns in groups.items():
+        configurations.append((f'-{group}', np.setdiff1d(all_columns, columns)))
+    if len(groups) > 1:
+        for group, columns in groups.items():
+            configurations.append((f'+{group}', columns))
+    return configurations
+
+
+def fit_and_score(model, train_data, train_labels, test_data, test_labels, name, columns):
+    """
+    Trains a model on a column slice of the training data and evaluates it on the same slice of the test data.
+
+    Parameters:
+    - model: An unfitted classifier.
+    - train_data: Feature matrix (CSR) for the training data.
+    - train_labels: Labels for the training data.
+    - test_data: Feature matrix (CSR) for the test data.
+    - test_labels: Labels for the test data.
+    - name (str): The name of the configuration.
+    - columns (numpy.ndarray): The columns to use.
+
+    Returns:
+    - dict: The name, number of columns, accuracy, macro and weighted F1 and fit time of the configuration.
+    """
+    from sklearn.metrics import accuracy_score, f1_score
+
+    start = time.perf_counter()
+    model.fit(train_data[:, columns], train_labels)
+    fit_seconds = time.perf_counter() - start
+    predictions = model.predict(test_data[:, columns])
+
+    return {
+        'configuration': name,
+        'columns': len(columns),
+        'accuracy': accuracy_score(test_labels, predictions),
+        'macro_f1': f1_score(test_labels, predictions, average='macro', zero_division=0),
+        'weighted_f1': f1_score(test_labels, predictions, average='weighted', zero_division=0),
+        'fit_seconds': fit_seconds,
+    }
+
+
+def run_ablation(model, train_data, train_labels, test_data, test_labels, groups, workers=-1):
+    """
+    Runs a feature-group ablation study in parallel: every configuration trains a copy of the model on a column slice of
+    the cached feature matrices, so no features need to be extracted again. joblib memory-maps the large matrices, so the
+    worker processes share them instead of each getting a copy.
+
+    Parameters:
+    - model: An unfitted classifier, which is copied for every configuration.
+    - train_data: Feature matrix for the training data.
+    - train_labels: Labels for the training data.
+    - test_data: Feature matrix for the test data.
+    - test_labels: Labels for the test data.
+    - groups (dict): The columns of every feature group, see column_groups.
+    - workers (int): Number of worker processes (-1 for all CPUs).
+
+    Returns:
+    - list of dict: The scores of every configuration, see fit_and_score.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.base import clone
+
+    train_data = train_data.tocsr()
+    test_data = test_data.tocsr()
+    return Parallel(n_jobs=workers, verbose=10)(
+        delayed(fit_and_score)(clone(model), train_data, train_labels, test_data, test_labels, name, columns)
+        for name, columns in ablation_configurations(groups))
+
+
+def write_ablation_results(results, file_path):
+    """
+    Prints the results of an ablation study as a table and writes them to a CSV file.
+
+    Parameters:
+    - results (list of dict): The scores of every configuration, see run_ablation.
+    - file_path (str): Path to the CSV file.
+    """
+    print(f"{'Configuration':<28}{'Columns':>10}{'Accuracy':>10}{'Macro F1':>10}{'Weighted F1':>13}{'Fit (s)':>10}")
+    for result in results:
+        print(f"{result['configuration']:<28}{result['columns']:>10}{result['accuracy']:>10.4f}{result['macro_f1']:>10.4f}"
+              f"{result['weighted_f1']:>13.4f}{result['fit_seconds']:>10.1f}")
+
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+    print(f'\n The ablation results are saved in {file_path}')
@@ -0,0 +1,130 @@
+import re
+import numpy as np
+
+# Numbered (core) arguments, with the C- (continuation) and R- (reference) prefixes and function tags like ARG1-DSP
+CORE_ARGUMENT = re.compile(r'^(?:[CR]-)?(ARG[0-9A])(?:-|$)')
+
+
+def core_argument(label):
+    """
+    Gets the numbered argument a label refers to.
+
+    Parameters:
+    - label (str): A role label, e.g. 'ARG1', 'C-ARG1', 'ARG1-DSP' or 'ARGM-TMP'.
+
+    Returns:
+    - str: The numbered argument (e.g. 'ARG1'), or None for modifiers and '_'.
+    """
+    match = CORE_ARGUMENT.match(label)
+    return match.group(1) if match else None
+
+
+def frame_arguments(roleset_arguments):
+    """
+    Gets the numbered arguments that the roleset of a PropBank frame defines.
+
+    Parameters:
+    - roleset_arguments (list of str): The entry of a frame in predicates/*_arguments.pkl, e.g. ['ARG0', 'ARG1', 'ARG2']
+      for post.01.
+
+    Returns:
+    - set of str: The numbered arguments of the frame, e.g. {'ARG0', 'ARG1', 'ARG2'}.
+    """
+    return {core_argument(argument) for argument in roleset_arguments if core_argument(argument)}
+
+
+def candidate_classes(classes, frame, frame_args):
+    """
+    Restricts the classes of the model to the labels a predicate can take: '_', the numbered arguments of its frame (also
+    with C-/R- prefixes and function tags), and the modifiers (ARGM). Predicates without a known frame keep all classes.
+
+    Parameters:
+    - classes (list of str): The classes of the model.
+    - frame (str): The PropBank frame of the predicate, e.g. 'post.01'.
+    - frame_args (dict): The numbered arguments of the roleset of every frame, see propbank.save_roleset_arguments.
+
+    Returns:
+    - tuple of int: The indices of the candidate classes.
+    """
+    if frame not in frame_args or not frame_arguments(frame_args[frame]):
+        return tuple(range(len(classes)))
+
+    arguments = frame_arguments(frame_args[frame])
+    return tuple(i for i, label in enumerate(classes)
+                 if label == '_' or 'ARGM' in label or core_argument(label) in arguments)
+
+
+def decode_predicate(scores, labels):
+    """
+    Chooses the label of every token of one predicate, such that every numbered argument is given to at most one token.
+    Tokens are decoded greedily from the most to the least confident; a token whose best numbered argument is already
+    taken gets its best label that is still available.
+
+    Parameters:
+    - scores (numpy.ndarray): Log-probabilities of the candidate labels, one row per token.
+    - labels (list of str): The candidate labels.
+
+    Returns:
+    - list of str: The label of every token.
+    """
+    # Only the plain numbered arguments are unique, continuations and references may repeat
+    unique = [core_argument(label) == label for label in labels]
+    ranking = np.argsort(-scores, axis=1)
+    taken = set()
+    decoded = [None] * len(scores)
+
+    for token in np.argsort(-scores.max(axis=1)):
+        for label_index in ranking[token]:
+            if not (unique[label_index] and label_index in taken):
+                break
+        if unique[label_index]:
+            taken.add(label_index)
+        decoded[token] = labels[label_index]
+
+    return decoded
+
+
+def constrained_predict(model, data, predicate_offsets, frames, frame_args):
+    """
+    Predicts the roles with frame-constrained decoding. Predicates with the same candidate classes are scored together,
+    against only the coefficient rows of their candidate classes, and the numbered arguments of every predicate are unique.
+
+    Parameters:
+    - model (LogisticRegression): A trained multinomial logistic regression model.
+    - data: Feature matrix with the tokens of every predicate, in order.
+    - predicate_offsets (numpy.ndarray): The row where the tokens of every predicate start, followed by the number of rows.
+    - frames (list of str): The PropBank frame of every predicate (None if unknown).
+    - frame_args (dict): The numbered arguments of the roleset of every frame, see propbank.save_roleset_arguments.
+
+    Returns:
+    - numpy.ndarray: The predicted label of every token.
+    """
+    classes = list(model.classes_)
+    if model.coef_.shape[0] != len(classes):
+        # A binary model has a single coefficient row, there is nothing to restrict
+        return model.predict(data)
+
+    data = data.tocsr()
+    predictions = np.empty(data.shape[0], dtype=object)
+
+    # Group the predicates by their candidate classes
+    groups = {}
+    for predicate, frame in enumerate(frames):
+        groups.setdefault(candidate_classes(classes, frame, frame_args), []).append(predicate)
+
+    for candidates, predicates in groups.items():
+        candidates = np.array(candidates)
+        labels = [classes[i] for i in candidates]
+        rows = np.concatenate([np.arange(predicate_offsets[p], predicate_offsets[p+1]) for p in predicates])
+        scores = np.asarray(data[rows] @ model.coef_[candidates].T) + model.intercept_[candidates]
+        # Log-softmax over the candidates, so that the confidence of tokens can be compared
+        scores -= scores.max(axis=1, keepdims=True)
+        scores -= np.log(np.exp(scores).sum(axis=1, keepdims=True))
+
+        start = 0
+        for p in predicates:
+            n_tokens = predicate_offsets[p+1] - predicate_offsets[p]
+            predictions[predicate_offsets[p]:predicate_offsets[p+1]] = decode_predicate(scores[start:start+n_tokens], labels)
+            start += n_tokens
+
+    return predictions
@@ -1,6 +1,4 @@
-import pandas as pd
 from get_data import read_data
-from tqdm import tqdm
 
 def extract_features(file_path):
     """
@@ -11,6 +9,8 @@ def extract_features(file_path):
     - pandas.DataFrame: A DataFrame where each row contains the features of a token: 
       'Token', 'Token-Predicate Distance', 'Relative Position'.
     """
+    import pandas as pd
+
     features = []
 
     with open(file_path, 'r', encoding='utf-8') as file:
@@ -78,6 +78,8 @@ def extract_pred_features(sentence):
     return sentence
 
 if __name__ == "__main__":
+    from tqdm import tqdm
+
     file_type = 'train'
     sentences = read_data(file_type)
     features = []
@@ -0,0 +1,317 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# Token fields stored once per sentence, shared by all predicate copies of the sentence
+TOKEN_FIELDS = ['TOKEN_ID', 'TOKEN', 'LEMMA', 'UPOS', 'DEPHEAD', 'DEPREL', 'PRED_COLUMN']
+# Predicate fields stored once per predicate copy, as string IDs (-1 if missing)
+PREDICATE_FIELDS = ['PRED_FRAME', 'PRED_TOKEN', 'PRED_TOKEN_ID']
+# Sentence fields stored once per sentence, as string IDs
+SENTENCE_FIELDS = ['DOC_ID', 'SENT_ID', 'SENT_TEXT']
+# Shards of a dataset (see sharding.py) keep their CoNLL-U file and corpus with their features, outside of data/
+SHARD_DIR = 'features/shards'
+
+
+def corpus_path(file_type):
+    """
+    Get the path of the binary preprocessed corpus of a dataset.
+
+    Parameters:
+    - file_type (str): The type of the dataset (e.g., 'train', 'test', 'dev').
+
+    Returns:
+    - str: The path of the corpus directory.
+    """
+    if is_shard(file_type):
+        return os.path.join(SHARD_DIR, f'{file_type}.srl')
+    return f'data/converted-{file_type}.srl'
+
+
+def is_shard(file_type):
+    """
+    Checks whether a dataset is a shard of another dataset.
+
+    Parameters:
+    - file_type (str): The type of the dataset, e.g. 'train' or 'train.shard-003-of-008' (see sharding.shard_name).
+
+    Returns:
+    - bool: Whether the dataset is a shard.
+    """
+    return '.shard-' in file_type
+
+
+def file_sha256(file_path):
+    """
+    Computes the SHA-256 checksum of a file.
+
+    Parameters:
+    - file_path (str): Path to the file.
+
+    Returns:
+    - str: The hexadecimal checksum.
+    """
+    checksum = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def source_signature(file_path):
+    """
+    Describes the CoNLL-U file a corpus is converted from, to notice later when it changed.
+
+    Parameters:
+    - file_path (str): Path to the CoNLL-U file.
+
+    Returns:
+    - dict: The path, size, modification time and SHA-256 checksum of the file.
+    """
+    stat = os.stat(file_path)
+    return {'path': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(file_path)}
+
+
+def corpus_matches_source(path):
+    """
+    Checks whether a corpus is still up to date with the CoNLL-U file it was converted from.
+    The size and modification time are compared first; the checksum is only computed when just the modification time changed,
+    and if the content is the same, the new modification time is recorded so the next check is fast again.
+
+    Parameters:
+    - path (str): The directory of the corpus.
+
+    Returns:
+    - bool: False if the source file changed or the corpus does not record its source, True otherwise (also when the source
+      file is not available anymore, as there is nothing to convert again).
+    """
+    meta_path = os.path.join(path, 'meta.json')
+    with open(meta_path, encoding='utf-8') as f:
+        metadata = json.load(f)
+    source = metadata.get('source')
+    if source is None:
+        return False
+    if not os.path.exists(source['path']):
+        return True
+
+    stat = os.stat(source['path'])
+    if stat.st_size != source['size']:
+        return False
+    if stat.st_mtime_ns == source['mtime_ns']:
+        return True
+    if file_sha256(source['path']) != source['sha256']:
+        return False
+
+    source['mtime_ns'] = stat.st_mtime_ns
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    return True
+
+
+def write_corpus(sentences, path, source=None):
+    """
+    Writes raw sentences and their predicate copies to the binary preprocessed corpus format.
+    The corpus is a directory of columnar numpy arrays: all strings are interned in a single string table, tokens are stored
+    once per sentence, and every predicate copy only stores its predicate and the argument labels of its tokens. Sentences and
+    predicates point to their tokens and labels through integer offsets.
+
+    Parameters:
+    - sentences (iterable of dict): Raw sentences as yielded by get_data.iter_conllu.
+    - path (str): The directory to write the corpus to.
+    - source (str): Path to the CoNLL-U file the sentences are read from, recorded to convert it again when it changes (optional).
+
+    Returns:
+    - dict: The metadata of the written corpus.
+    """
+    from get_data import expand_predicates
+
+    strings = {}
+
+    def intern(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    sentence_columns = {field: [] for field in SENTENCE_FIELDS}
+    sentence_raw_tokens = []
+    token_offsets = [0]
+    token_columns = {field: [] for field in TOKEN_FIELDS}
+    predicate_columns = {field: [] for field in PREDICATE_FIELDS}
+    predicate_sentence = []
+    predicate_position = []
+    role_offsets = [0]
+    roles = []
+
+    for sentence in sentences:
+        sentence_index = len(sentence_raw_tokens)
+        for field in SENTENCE_FIELDS:
+            sentence_columns[field].append(intern(sentence[field]))
+        sentence_raw_tokens.append(len(sentence['ROWS']))
+
+        # The token lines with all needed columns, as used by expand_predicates
+        rows = [row for row in sentence['ROWS'] if len(row) >= 11]
+        for row in rows:
+            for field, column in zip(TOKEN_FIELDS, [0, 1, 2, 3, 6, 7, 10]):
+                token_columns[field].append(intern(row[column]))
+        token_offsets.append(token_offsets[-1] + len(rows))
+
+        for pred_sentence in expand_predicates(sentence):
+            predicate_sentence.append(sentence_index)
+            for field in PREDICATE_FIELDS:
+                predicate_columns[field].append(intern(pred_sentence[field]) if field in pred_sentence else -1)
+            if len(pred_sentence['FEATURES']) != len(rows):
+                raise ValueError(f"Sentence {sentence['DOC_ID']}-{sentence['SENT_ID']} has token lines with a different number of columns.")
+            position = -1
+            for i, token in enumerate(pred_sentence['FEATURES']):
+                roles.append(intern(token['ROLE']))
+                if token['PRED'] != '_':
+                    position = i
+            predicate_position.append(position)
+            role_offsets.append(len(roles))
+
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        'sentence_raw_tokens': np.array(sentence_raw_tokens, dtype=np.int32),
+        'token_offsets': np.array(token_offsets, dtype=np.int64),
+        'predicate_sentence': np.array(predicate_sentence, dtype=np.int32),
+        'predicate_position': np.array(predicate_position, dtype=np.int32),
+        'role_offsets': np.array(role_offsets, dtype=np.int64),
+        'role': np.array(roles, dtype=np.int32),
+    }
+    for field in SENTENCE_FIELDS:
+        arrays[f'sentence_{field.lower()}'] = np.array(sentence_columns[field], dtype=np.int32)
+    for field in TOKEN_FIELDS:
+        arrays[f'token_{field.lower()}'] = np.array(token_columns[field], dtype=np.int32)
+    for field in PREDICATE_FIELDS:
+        arrays[f'predicate_{field.lower()}'] = np.array(predicate_columns[field], dtype=np.int32)
+
+    # The string table: UTF-8 bytes of all strings, and the offset where each of them starts
+    encoded = [value.encode('utf-8') for value in strings]
+    arrays['string_offsets'] = np.cumsum([0] + [len(value) for value in encoded], dtype=np.int64)
+    with open(os.path.join(path, 'strings.bin'), 'wb') as f:
+        f.write(b''.join(encoded))
+
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+
+    metadata = {
+        'version': FORMAT_VERSION,
+        'sentences': len(sentence_raw_tokens),
+        'tokens': token_offsets[-1],
+        'predicates': len(predicate_sentence),
+        'strings': len(strings),
+        'arrays': sorted(arrays),
+        'source': source_signature(source) if source else None,
+    }
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
+    return metadata
+
+
+def load_corpus(path):
+    """
+    Loads a binary preprocessed corpus. The arrays are memory-mapped, so they are only read from disk when they are accessed;
+    only the (small) table of unique strings is decoded.
+
+    Parameters:
+    - path (str): The directory of the corpus.
+
+    Returns:
+    - dict: The metadata ('META'), the decoded string table ('STRINGS') and every array of the corpus by name.
+    """
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        metadata = json.load(f)
+    if metadata['version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported corpus format version {metadata['version']} in {path}, convert the data again.")
+
+    corpus = {'META': metadata}
+    for name in metadata['arrays']:
+        corpus[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+    with open(os.path.join(path, 'strings.bin'), 'rb') as f:
+        blob = f.read()
+    offsets = corpus['string_offsets']
+    corpus['STRINGS'] = [blob[offsets[i]:offsets[i+1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    return corpus
+
+
+def iter_pred_sentences(corpus):
+    """
+    Iterates over the predicate copies of a binary corpus, rebuilding the sentence dictionaries of get_data.read_data.
+
+    Parameters:
+    - corpus (dict): A corpus loaded with load_corpus.
+
+    Yields:
+    - dict: One sentence dictionary per predicate, see get_data.expand_predicates.
+    """
+    strings = corpus['STRINGS']
+    # Per-predicate and per-sentence columns are read once as plain lists, instead of indexing the memory maps per value
+    token_offsets = np.asarray(corpus['token_offsets']).tolist()
+    role_offsets = np.asarray(corpus['role_offsets']).tolist()
+    predicate_sentence = np.asarray(corpus['predicate_sentence']).tolist()
+    predicate_position = np.asarray(corpus['predicate_position']).tolist()
+    predicate_columns = {field: np.asarray(corpus[f'predicate_{field.lower()}']).tolist() for field in PREDICATE_FIELDS}
+    sentence_columns = {field: np.asarray(corpus[f'sentence_{field.lower()}']).tolist() for field in SENTENCE_FIELDS}
+    # Plain array views of the memory maps, which are much cheaper to slice
+    token_columns = {field: np.asarray(corpus[f'token_{field.lower()}']) for field in TOKEN_FIELDS}
+    role = np.asarray(corpus['role'])
+
+    current_sentence = -1
+    for p, s in enumerate(predicate_sentence):
+        if s != current_sentence:
+            # The token strings are shared by all predicate copies of the sentence
+            current_sentence = s
+            # Predicate copies are numbered within their sentence
+            pred_id = 0
+            start, end = token_offsets[s], token_offsets[s+1]
+            columns = {field: [strings[i] for i in token_columns[field][start:end].tolist()] for field in TOKEN_FIELDS}
+        else:
+            pred_id += 1
+
+        pred_sentence = {
+            'DOC_ID': strings[sentence_columns['DOC_ID'][s]],
+            'SENT_ID': strings[sentence_columns['SENT_ID'][s]],
+            'SENT_TEXT': strings[sentence_columns['SENT_TEXT'][s]],
+            'PRED_ID': str(pred_id),
+            'FEATURES': []
+        }
+        for field in PREDICATE_FIELDS:
+            if predicate_columns[field][p] != -1:
+                pred_sentence[field] = strings[predicate_columns[field][p]]
+
+        position = predicate_position[p]
+        labels = role[role_offsets[p]:role_offsets[p+1]].tolist()
+        for i, label in enumerate(labels):
+            pred_sentence['FEATURES'].append({
+                'TOKEN_ID': columns['TOKEN_ID'][i],
+                'TOKEN': columns['TOKEN'][i],
+                'LEMMA': columns['LEMMA'][i],
+                "UPOS": columns['UPOS'][i],
+                "DEPHEAD": columns['DEPHEAD'][i],
+                "DEPREL": columns['DEPREL'][i],
+                "PRED": columns['PRED_COLUMN'][i] if i == position else '_',
+                "ROLE": strings[label]
+                })
+
+        yield pred_sentence
+
+
+def predicate_frames(corpus):
+    """
+    Gets the unique predicate frames of a binary corpus, without reading any token data.
+
+    Parameters:
+    - corpus (dict): A corpus loaded with load_corpus.
+
+    Returns:
+    - list of str: The unique predicate frames, in order of first occurrence.
+    """
+    frame_ids = np.asarray(corpus['predicate_pred_frame'])
+    frame_ids = frame_ids[frame_ids != -1]
+    unique_ids, first = np.unique(frame_ids, return_index=True)
+    return [corpus['STRINGS'][i] for i in unique_ids[np.argsort(first)]]
@@ -61,7 +61,7 @@ def extract_dependency_features(sentence):
 
         # Store features for this token
         sentence['FEATURES'][i]['DEPENDENCY_HEAD_TOKEN'] = head_token
-        sentence['FEATURES'][i]['DEPENDENCY_PATH'] = ' '.join(dependency_path),
+        sentence['FEATURES'][i]['DEPENDENCY_PATH'] = ' '.join(dependency_path)
         sentence['FEATURES'][i]['DEPENDENCY_DISTANCE'] = distance
 
         
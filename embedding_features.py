@@ -0,0 +1,161 @@
+from array import array
+from functools import lru_cache
+import os
+import numpy as np
+
+WORD2VEC_PATH = 'embeddings/GoogleNews-vectors-negative300.bin'
+EMBEDDINGS_PATH = 'embeddings/GoogleNews-vectors-negative300.kv'
+
+# Embeddings added for every token, each as a block of columns of the feature matrix
+EMBEDDING_SLOTS = ['LEMMA_EMB', 'PREV_LEMMA_EMB', 'NEXT_LEMMA_EMB', 'PRED_EMB']
+
+# Loaded embeddings per path, so every process loads them only once
+loaded_embeddings = {}
+
+# Number of tokens whose vectors are gathered at once when building the embedding block
+BLOCK_CHUNK_TOKENS = 4096
+
+
+def convert_embeddings(source=WORD2VEC_PATH, target=EMBEDDINGS_PATH):
+    """
+    Converts word2vec binary embeddings to the native gensim KeyedVectors format, which can be memory-mapped.
+    This only needs to be done once, loading the word2vec binary is what makes the embeddings slow to use.
+
+    Parameters:
+    - source (str): Path to the word2vec binary file.
+    - target (str): Path to save the KeyedVectors file to.
+    """
+    from gensim.models import KeyedVectors
+
+    word_embedding_model = KeyedVectors.load_word2vec_format(source, binary=True)
+    # Store the vectors in their own .npy file, so that they can be memory-mapped
+    word_embedding_model.save(target, separately=['vectors'])
+
+
+def load_embeddings(path=EMBEDDINGS_PATH):
+    """
+    Loads embeddings in the native KeyedVectors format, with the vectors memory-mapped read-only.
+    The vectors are not read into memory, and the pages that are read are shared by all processes that load the same file.
+
+    Parameters:
+    - path (str): Path to the KeyedVectors file.
+
+    Returns:
+    - KeyedVectors: The embeddings.
+    """
+    if path not in loaded_embeddings:
+        from gensim.models import KeyedVectors
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'Embeddings not found in {path}, convert the word2vec file with embedding_features.py first.')
+        loaded_embeddings[path] = KeyedVectors.load(path, mmap='r')
+    return loaded_embeddings[path]
+
+
+@lru_cache(maxsize=100000)
+def lookup(word, path=EMBEDDINGS_PATH):
+    """
+    Finds the row of a word in the embeddings. The word is also tried in lowercase and capitalized, as the embeddings are
+    case-sensitive. Lemmas repeat a lot, so the results are cached.
+
+    Parameters:
+    - word (str): The word to look up.
+    - path (str): Path to the KeyedVectors file.
+
+    Returns:
+    - int: The row of the word in the embedding vectors, or -1 if it has no embedding.
+    """
+    key_to_index = load_embeddings(path).key_to_index
+    for candidate in (word, word.lower(), word.capitalize()):
+        if candidate in key_to_index:
+            return key_to_index[candidate]
+    return -1
+
+
+def new_embedding_rows():
+    """
+    Creates empty columns to collect the embedding rows of tokens in.
+
+    Returns:
+    - dict: An integer array per embedding slot.
+    """
+    return {slot: array('i') for slot in EMBEDDING_SLOTS}
+
+
+def extract_embedding_features(sentence, embedding_rows, path=EMBEDDINGS_PATH):
+    """
+    Looks up the embeddings of the lemmas (current, previous, next) and the predicate of each token in a sentence.
+    Only the rows of the embeddings are stored, the vectors themselves are gathered by build_embedding_block.
+
+    Parameters:
+    - sentence (dict): A dictionary representing a sentence, with 'PRED_TOKEN' and the token features ('FEATURES'),
+      which must still contain the 'LEMMA' of each token.
+    - embedding_rows (dict): The embedding rows to append to, see new_embedding_rows.
+    - path (str): Path to the KeyedVectors file.
+    """
+    pred_row = lookup(sentence['PRED_TOKEN'], path) if 'PRED_TOKEN' in sentence else -1
+    lemma_rows = [lookup(token['LEMMA'], path) for token in sentence['FEATURES']]
+
+    for i, lemma_row in enumerate(lemma_rows):
+        embedding_rows['LEMMA_EMB'].append(lemma_row)
+        embedding_rows['PREV_LEMMA_EMB'].append(lemma_rows[i-1] if i != 0 else -1)
+        embedding_rows['NEXT_LEMMA_EMB'].append(lemma_rows[i+1] if i+1 < len(lemma_rows) else -1)
+        embedding_rows['PRED_EMB'].append(pred_row)
+
+
+def build_embedding_block(embedding_rows, path=EMBEDDINGS_PATH, chunk_tokens=BLOCK_CHUNK_TOKENS):
+    """
+    Gathers the embeddings of all tokens into a sparse float32 block, to be joined to the sparse feature matrix.
+    The CSR arrays are filled directly, a chunk of tokens at a time, so no dense block of all tokens is ever built.
+    Tokens without an embedding have no entries in the columns of that slot.
+
+    Parameters:
+    - embedding_rows (dict): The embedding rows of the tokens, see extract_embedding_features.
+    - path (str): Path to the KeyedVectors file.
+    - chunk_tokens (int): The number of tokens whose vectors are gathered at once.
+
+    Returns:
+    - scipy.sparse.csr_matrix: A float32 matrix with one row per token and the vector size for each embedding slot as columns.
+    """
+    from scipy.sparse import csr_matrix
+
+    vectors = load_embeddings(path).vectors
+    dim = vectors.shape[1]
+    rows = np.stack([np.frombuffer(embedding_rows[slot], dtype=np.int32) for slot in EMBEDDING_SLOTS], axis=1)
+    found = rows >= 0
+    n_tokens = rows.shape[0]
+
+    # Every embedding a token has takes dim entries, in the order of the slots
+    indptr = np.zeros(n_tokens + 1, dtype=np.int64)
+    np.cumsum(found.sum(axis=1) * dim, out=indptr[1:])
+    data = np.empty(indptr[-1], dtype=np.float32)
+    indices = np.empty(indptr[-1], dtype=np.int32)
+
+    for start in range(0, n_tokens, chunk_tokens):
+        end = min(start + chunk_tokens, n_tokens)
+        # The embeddings of the chunk, token by token and slot by slot within a token
+        token, slot = np.nonzero(found[start:end])
+        first, last = indptr[start], indptr[end]
+        data[first:last] = vectors[rows[start + token, slot]].ravel()
+        indices[first:last] = (slot[:, None] * dim + np.arange(dim)).ravel()
+
+    return csr_matrix((data, indices, indptr), shape=(n_tokens, dim * len(EMBEDDING_SLOTS)))
+
+
+def embedding_feature_names(path=EMBEDDINGS_PATH):
+    """
+    Gets the names of the columns of the embedding block.
+
+    Parameters:
+    - path (str): Path to the KeyedVectors file.
+
+    Returns:
+    - list of str: The name of every column, e.g. 'LEMMA_EMB_0'.
+    """
+    dim = load_embeddings(path).vector_size
+    return [f'{slot}_{i}' for slot in EMBEDDING_SLOTS for i in range(dim)]
+
+
+if __name__ == "__main__":
+    print(f'Converting {WORD2VEC_PATH} to {EMBEDDINGS_PATH}...')
+    convert_embeddings()
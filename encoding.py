@@ -0,0 +1,110 @@
+from array import array
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Token features with string values, one-hot encoded like DictVectorizer does ('FEATURE=value')
+CATEGORICAL_FIELDS = ['UPOS', 'DEPREL', 'NER', 'RELATIVE_POS', 'CURR_LEMMA', 'PREV_LEMMA', 'NEXT_LEMMA', 'PREV_UPOS',
+                      'NEXT_UPOS', 'VOICE', 'DEPENDENCY_HEAD_TOKEN', 'DEPENDENCY_PATH']
+# Token features with numeric values, stored as they are in a single column
+NUMERIC_FIELDS = ['PRED_DISTANCE', 'DEPENDENCY_DISTANCE']
+
+
+def new_vocabulary():
+    """
+    Creates an empty vocabulary for the encoded mode.
+    Every value of a categorical field (and every numeric field) gets a column of the design matrix the first time it is
+    seen, so the integer ID of a value is directly its column, and the columns of known values never move when new values
+    are added.
+
+    Returns:
+    - dict: The column of every value per field ('COLUMNS') and the name of every column ('FEATURE_NAMES').
+    """
+    return {
+        'COLUMNS': {field: {} for field in CATEGORICAL_FIELDS + NUMERIC_FIELDS},
+        'FEATURE_NAMES': []
+    }
+
+
+def new_encoded_features():
+    """
+    Creates empty columns to collect encoded token features in.
+
+    Returns:
+    - dict: An integer array of column IDs per categorical field, and a float array of values per numeric field.
+    """
+    encoded = {field: array('i') for field in CATEGORICAL_FIELDS}
+    encoded.update({field: array('d') for field in NUMERIC_FIELDS})
+    return encoded
+
+
+def get_column(vocabulary, field, value, grow):
+    """
+    Gets the column of a field value, adding it to the vocabulary if it is new and grow is set.
+
+    Parameters:
+    - vocabulary (dict): The vocabulary, see new_vocabulary.
+    - field (str): The name of the field.
+    - value (str): The value, or None for numeric fields.
+    - grow (bool): Whether unseen values are added to the vocabulary (training data) or ignored (test data).
+
+    Returns:
+    - int: The column, or -1 for unseen values that were not added.
+    """
+    columns = vocabulary['COLUMNS'][field]
+    column = columns.get(value, -1)
+    if column == -1 and grow:
+        column = len(vocabulary['FEATURE_NAMES'])
+        columns[value] = column
+        vocabulary['FEATURE_NAMES'].append(field if value is None else f'{field}={value}')
+    return column
+
+
+def encode_token(token, vocabulary, encoded, grow):
+    """
+    Encodes the features of a token into integer column IDs and appends them to the encoded columns.
+    Missing features, values that are not strings (e.g. RELATIVE_POS of the predicate itself, which is 0) and unseen values
+    are stored as -1, and are left out of the design matrix like DictVectorizer does.
+
+    Parameters:
+    - token (dict): The features of a token, as returned by the feature extractors.
+    - vocabulary (dict): The vocabulary, see new_vocabulary.
+    - encoded (dict): The encoded columns to append to, see new_encoded_features.
+    - grow (bool): Whether unseen values are added to the vocabulary.
+    """
+    for field in CATEGORICAL_FIELDS:
+        value = token.get(field)
+        encoded[field].append(get_column(vocabulary, field, value, grow) if isinstance(value, str) else -1)
+    for field in NUMERIC_FIELDS:
+        get_column(vocabulary, field, None, grow)
+        encoded[field].append(token.get(field, 0))
+
+
+def build_design_matrix(encoded, vocabulary, dtype=np.float64):
+    """
+    Assembles the sparse design matrix straight from the encoded columns, without building 'FEATURE=value' keys.
+
+    Parameters:
+    - encoded (dict): The encoded columns, see new_encoded_features.
+    - vocabulary (dict): The vocabulary the columns were encoded with.
+    - dtype (numpy.dtype): The type of the values, e.g. np.float32 for compact matrices.
+
+    Returns:
+    - scipy.sparse.csr_matrix: The design matrix, with one row per token and one column per vocabulary entry.
+    """
+    n_tokens = len(encoded[CATEGORICAL_FIELDS[0]])
+    numeric_columns = [vocabulary['COLUMNS'][field].get(None, -1) for field in NUMERIC_FIELDS]
+
+    indices = np.empty((n_tokens, len(CATEGORICAL_FIELDS) + len(NUMERIC_FIELDS)), dtype=np.int32)
+    data = np.ones(indices.shape, dtype=dtype)
+    for i, field in enumerate(CATEGORICAL_FIELDS):
+        indices[:, i] = np.frombuffer(encoded[field], dtype=np.int32)
+    for i, field in enumerate(NUMERIC_FIELDS, start=len(CATEGORICAL_FIELDS)):
+        indices[:, i] = numeric_columns[i - len(CATEGORICAL_FIELDS)]
+        data[:, i] = np.frombuffer(encoded[field], dtype=np.float64)
+
+    # Leave out missing and unseen values, and zeros of numeric features
+    keep = (indices >= 0) & (data != 0)
+    indptr = np.concatenate([[0], np.cumsum(keep.sum(axis=1))])
+    matrix = csr_matrix((data[keep], indices[keep], indptr), shape=(n_tokens, len(vocabulary['FEATURE_NAMES'])))
+    matrix.sort_indices()
+    return matrix
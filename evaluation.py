@@ -0,0 +1,167 @@
+import os
+import csv
+import numpy as np
+
+
+def new_confusion(classes):
+    """
+    Creates empty confusion counts for the given classes.
+
+    Parameters:
+    - classes (list of str): The classes of the model.
+
+    Returns:
+    - dict: The labels in matrix order ('LABELS'), their index ('INDEX') and the counts ('COUNTS', gold labels as rows).
+    """
+    labels = list(classes)
+    return {
+        'LABELS': labels,
+        'INDEX': {label: i for i, label in enumerate(labels)},
+        'COUNTS': np.zeros((len(labels), len(labels)), dtype=np.int64)
+    }
+
+
+def update_confusion(confusion, gold_labels, predictions):
+    """
+    Adds the gold labels and predictions of one chunk to the confusion counts.
+    Gold labels that the model does not know are added as new rows and columns.
+
+    Parameters:
+    - confusion (dict): The confusion counts, see new_confusion.
+    - gold_labels (list of str): The gold labels of the chunk.
+    - predictions (list of str): The predicted labels of the chunk.
+    """
+    for label in gold_labels:
+        if label not in confusion['INDEX']:
+            confusion['INDEX'][label] = len(confusion['LABELS'])
+            confusion['LABELS'].append(label)
+    n_labels = len(confusion['LABELS'])
+    if confusion['COUNTS'].shape[0] < n_labels:
+        grown = np.zeros((n_labels, n_labels), dtype=np.int64)
+        grown[:confusion['COUNTS'].shape[0], :confusion['COUNTS'].shape[1]] = confusion['COUNTS']
+        confusion['COUNTS'] = grown
+
+    gold_index = np.fromiter((confusion['INDEX'][label] for label in gold_labels), dtype=np.int64, count=len(gold_labels))
+    predicted_index = np.fromiter((confusion['INDEX'][label] for label in predictions), dtype=np.int64, count=len(predictions))
+    np.add.at(confusion['COUNTS'], (gold_index, predicted_index), 1)
+
+
+def label_scores(confusion):
+    """
+    Computes the precision, recall, F1 and support of every label from the confusion counts.
+
+    Parameters:
+    - confusion (dict): The confusion counts, see new_confusion.
+
+    Returns:
+    - list of tuple: The label, precision, recall, F1 and support of every label.
+    """
+    counts = confusion['COUNTS']
+    true_positives = np.diag(counts).astype(np.float64)
+    predicted = counts.sum(axis=0)
+    support = counts.sum(axis=1)
+    precision = np.divide(true_positives, predicted, out=np.zeros_like(true_positives), where=predicted > 0)
+    recall = np.divide(true_positives, support, out=np.zeros_like(true_positives), where=support > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(true_positives), where=precision + recall > 0)
+    return list(zip(confusion['LABELS'], precision, recall, f1, support))
+
+
+def format_report(confusion):
+    """
+    Formats a classification report like sklearn's classification_report, from the confusion counts.
+
+    Parameters:
+    - confusion (dict): The confusion counts, see new_confusion.
+
+    Returns:
+    - str: The report, with a row per label that occurs in the gold labels or predictions, accuracy and averages.
+    """
+    scores = [row for row in label_scores(confusion) if row[4] > 0 or confusion['COUNTS'][:, confusion['INDEX'][row[0]]].sum() > 0]
+    scores.sort(key=lambda row: row[0])
+    total = confusion['COUNTS'].sum()
+    width = max([len(row[0]) for row in scores] + [len('weighted avg')])
+
+    lines = [f"{'':>{width}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", '']
+    for label, precision, recall, f1, support in scores:
+        lines.append(f"{label:>{width}} {precision:>9.2f} {recall:>9.2f} {f1:>9.2f} {support:>9}")
+    lines.append('')
+
+    accuracy = np.trace(confusion['COUNTS']) / total if total else 0.0
+    lines.append(f"{'accuracy':>{width}} {'':>9} {'':>9} {accuracy:>9.2f} {total:>9}")
+    support = np.array([row[4] for row in scores], dtype=np.float64)
+    for name, weights in [('macro avg', np.ones_like(support)), ('weighted avg', support)]:
+        averages = [np.average([row[i] for row in scores], weights=weights) if weights.sum() else 0.0 for i in (1, 2, 3)]
+        lines.append(f"{name:>{width}} {averages[0]:>9.2f} {averages[1]:>9.2f} {averages[2]:>9.2f} {total:>9}")
+
+    return '\n'.join(lines)
+
+
+def write_evaluation(confusion, output_dir, image=True):
+    """
+    Writes the classification report, the confusion matrix as CSV and (optionally) as an image to the output directory.
+    The image is drawn without a display, so this also works on a headless server.
+
+    Parameters:
+    - confusion (dict): The confusion counts, see new_confusion.
+    - output_dir (str): The directory to write to.
+    - image (bool): Whether to also save the confusion matrix as a PNG image.
+
+    Returns:
+    - str: The classification report.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    report = format_report(confusion)
+    with open(os.path.join(output_dir, 'classification_report.txt'), 'w', encoding='utf-8') as f:
+        f.write(report + '\n')
+
+    with open(os.path.join(output_dir, 'confusion_matrix.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['gold \\ predicted'] + confusion['LABELS'])
+        for label, row in zip(confusion['LABELS'], confusion['COUNTS']):
+            writer.writerow([label] + row.tolist())
+
+    if image:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        labels = confusion['LABELS']
+        plt.figure(figsize=(20, 20))
+        # Log scale, as '_' outnumbers the other labels by far
+        plt.imshow(np.log1p(confusion['COUNTS']), cmap='viridis')
+        plt.xticks(range(len(labels)), labels, rotation=90)
+        plt.yticks(range(len(labels)), labels)
+        plt.title('Confusion Matrix (log scale)')
+        plt.ylabel('Actual labels')
+        plt.xlabel('Predicted labels')
+        plt.colorbar()
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'confusion_matrix.png'))
+        plt.close()
+
+    return report
+
+
+def iter_matrix_chunks(data, labels, predicate_offsets, frames, chunk_size):
+    """
+    Splits a feature matrix into chunks of at least chunk_size rows, cut at predicate boundaries so that every chunk holds
+    whole predicates.
+
+    Parameters:
+    - data: The feature matrix (CSR).
+    - labels (list of str): The gold label of every row.
+    - predicate_offsets (numpy.ndarray): The row where every predicate starts, followed by the number of rows.
+    - frames (list of str): The PropBank frame of every predicate.
+    - chunk_size (int): The minimum number of rows per chunk (the last chunk can be smaller).
+
+    Yields:
+    - tuple: The rows of the chunk, their gold labels, the predicate offsets within the chunk and the frames of its predicates.
+    """
+    first = 0
+    while first < len(predicate_offsets) - 1:
+        start = predicate_offsets[first]
+        last = int(np.searchsorted(predicate_offsets, start + chunk_size))
+        last = min(max(last, first + 1), len(predicate_offsets) - 1)
+        end = predicate_offsets[last]
+        yield data[start:end], labels[start:end], predicate_offsets[first:last+1] - start, frames[first:last]
+        first = last
@@ -1,110 +1,172 @@
-import pandas as pd
-from tqdm import tqdm 
-import pickle
 import os
+from corpus_format import corpus_path, write_corpus, load_corpus, iter_pred_sentences, corpus_matches_source, is_shard, SHARD_DIR
 
-def read_data(file_type):
+def iter_conllu(file_path):
     """
-    Read data from a CoNLL-U formatted file and parse it into sentences and tokens.
-    Automatically checks if 'data/en_ewt-up-{file_type}.conllu' exists, if not asks for file_path
+    Stream a CoNLL-U formatted file sentence by sentence, without reading the whole file into memory.
 
     Parameters:
-    - file_type (str): The type of file to read (optional). 
+    - file_path (str): Path to the CoNLL-U formatted file.
+
+    Yields:
+    - dict: A dictionary with the document ID ('DOC_ID'), sentence ID ('SENT_ID'), sentence text ('SENT_TEXT') and the 
+      tab-separated columns of every token line ('ROWS').
+    """
+    with open(file_path, mode='r', encoding='utf-8') as f:
+        sentence = None
+        doc_id = ""
+        for line in f:
+            line = line.strip('\n')
+            # Extract document ID
+            if line.startswith('# newdoc id'):
+                doc_id = line.split("= ")[1]
+            # Extract sentence ID, which starts a new sentence
+            elif line.startswith('# sent_id'):
+                if sentence is not None:
+                    yield sentence
+                sentence = {
+                    'DOC_ID': doc_id,
+                    'SENT_ID': line.split("= ")[1].replace(doc_id + '-', ''),
+                    'SENT_TEXT': "",
+                    'ROWS': []
+                }
+            elif sentence is None:
+                continue
+            # Extract sentence text
+            elif line.startswith('# text'):
+                sentence['SENT_TEXT'] = line.split("= ")[1]
+            elif line.strip() != '' and not line.startswith('#'):
+                sentence['ROWS'].append(line.strip().split('\t'))
+
+        if sentence is not None:
+            yield sentence
+
+def expand_predicates(sentence):
+    """
+    Duplicate a sentence for each of its predicates, keeping only the argument column of that predicate.
+    Sentences without predicates result in an empty list, and the labels marking the predicate ('V', 'C-V') are removed.
+
+    Parameters:
+    - sentence (dict): A sentence as yielded by iter_conllu.
 
     Returns:
-    - tuple: A tuple containing a dictionary mapping document IDs and sentence IDs to sentence texts and a dataframe with the tokens information.
+    - list of dict: One dictionary per predicate, containing the sentence metadata, the predicate ('PRED_FRAME', 'PRED_TOKEN',
+      'PRED_TOKEN_ID') and the token information ('FEATURES').
     """
-    
-    # Find filepath
+    pred_sentences = []
+    pred = 0
+    for row in sentence['ROWS']:
+        if len(row) >= 11:  # Ensure all needed columns are present 
+            if row[10] != '_':
+                pred += 1    
+            
+            for i in range(11,len(row)):
+                if row[0] == '1':
+                    pred_sentences.append({
+                        'DOC_ID': sentence['DOC_ID'],
+                        'SENT_ID': sentence['SENT_ID'],
+                        'SENT_TEXT': sentence['SENT_TEXT'],
+                        'PRED_ID': str(i-11),
+                        'FEATURES': []
+                    })
+                
+                if pred == i-10 and row[10] != '_':
+                    pred_sentences[i-11]['PRED_FRAME'] = row[10]
+                    pred_sentences[i-11]['PRED_TOKEN'] = row[1]
+                    pred_sentences[i-11]['PRED_TOKEN_ID'] = row[0]
+                
+                pred_sentences[i-11]['FEATURES'].append({
+                    'TOKEN_ID': row[0],
+                    'TOKEN': row[1],
+                    'LEMMA': row[2],
+                    "UPOS": row[3],
+                    "DEPHEAD":  row[6],
+                    "DEPREL": row[7], 
+                    "PRED": row[10] if pred == i-10 else '_',
+                    "ROLE": row[i] if row[i] != 'V' and row[i] != 'C-V' else '_'
+                    })
+
+    return pred_sentences
+
+def find_data(file_type):
+    """
+    Find the CoNLL-U file of a dataset.
+    Automatically checks if 'data/en_ewt-up-{file_type}.conllu' exists, if not asks for file_path.
+    The CoNLL-U file of a shard (see sharding.split_dataset) is in the shard directory instead.
+
+    Parameters:
+    - file_type (str): The type of file to read.
+
+    Returns:
+    - str: The path to the CoNLL-U formatted file.
+    """
+    if is_shard(file_type):
+        return os.path.join(SHARD_DIR, f'{file_type}.conllu')
+
     file_path = f'data/en_ewt-up-{file_type}.conllu'
     if not os.path.exists(file_path):
         file_path = input(f'Please provide the file path to the {file_type} dataset:\n')
+    return file_path
 
-    # Read data from the CoNLL-U formatted file
-    with open(file_path, mode='r', encoding='utf-8') as f:
-            sentences = []  # Dictionary to store sentences with their document IDs
-            pred_sentences = []
-            pred = 0
-            sentence_id = ""
-            sentence_text = ""
-            doc_id = ""
-            for line in tqdm(f.readlines()):
-                line = line.strip('\n')
-                # Extract document ID
-                if line.startswith('# newdoc id'):
-                    doc_id = line.split("= ")[1]
-                # Extract sentence ID
-                elif line.startswith('# sent_id'):
-                    sentences.extend(pred_sentences)
-                    #print(pred)
-                    pred_sentences = []
-                    pred = 0
-                    sentence_id = line.split("= ")[1].replace(doc_id + '-', '')
-                # Extract sentence text and store in the sentences dictionary
-                elif line.startswith('# text'):
-                    sentence_text = line.split("= ")[1]
-                else:
-                    # Parse token information
-                    row = line.strip().split('\t')
-                    if len(row) >= 11:  # Ensure all needed columns are present 
-                        if row[10] != '_':
-                            pred += 1    
-                        
-                        for i in range(11,len(row)):
-                            if row[0] == '1':
-                                pred_sentences.append({
-                                    'DOC_ID': doc_id,
-                                    'SENT_ID': sentence_id,
-                                    'SENT_TEXT': sentence_text,
-                                    'PRED_ID': str(i-11),
-                                    'FEATURES': []
-                                })
-                            
-                            if pred == i-10 and row[10] != '_':
-                                pred_sentences[i-11]['PRED_FRAME'] = row[10]
-                                pred_sentences[i-11]['PRED_TOKEN'] = row[1]
-                                pred_sentences[i-11]['PRED_TOKEN_ID'] = row[0]
-                            
-                            pred_sentences[i-11]['FEATURES'].append({
-                                'TOKEN_ID': row[0],
-                                'TOKEN': row[1],
-                                'LEMMA': row[2],
-                                "UPOS": row[3],
-                                "DEPHEAD":  row[6],
-                                "DEPREL": row[7], 
-                                "PRED": row[10] if pred == i-10 else '_',
-                                "ROLE": row[i] if row[i] != 'V' and row[i] != 'C-V' else '_'
-                                })
-                            
-            sentences.extend(pred_sentences)              
-    
-    return sentences
+def iter_data(file_type):
+    """
+    Stream the sentences of a dataset, one for each predicate of each sentence, without keeping the whole dataset in memory.
+    If the dataset was converted to the binary corpus format before (see convert_data), it is loaded from there instead, after
+    converting it again if the CoNLL-U file changed since.
+    Otherwise automatically checks if 'data/en_ewt-up-{file_type}.conllu' exists, if not asks for file_path
 
-def convert_data(sentences, file_type):
+    Parameters:
+    - file_type (str): The type of file to read.
+
+    Yields:
+    - dict: A sentence dictionary for one predicate (see expand_predicates).
     """
-    Converts a list of sentence dictionaries to a .conllu format file.
+    from tqdm import tqdm
+
+    if os.path.exists(corpus_path(file_type)):
+        if not corpus_matches_source(corpus_path(file_type)):
+            convert_data(file_type)
+        corpus = load_corpus(corpus_path(file_type))
+        yield from tqdm(iter_pred_sentences(corpus), total=corpus['META']['predicates'])
+        return
+
+    for sentence in tqdm(iter_conllu(find_data(file_type))):
+        yield from expand_predicates(sentence)
+
+def read_data(file_type):
+    """
+    Read data from a CoNLL-U formatted file and parse it into sentences and tokens.
+    If the dataset was converted to the binary corpus format before (see convert_data), it is loaded from there instead.
+    Otherwise automatically checks if 'data/en_ewt-up-{file_type}.conllu' exists, if not asks for file_path
+
+    Parameters:
+    - file_type (str): The type of file to read (optional). 
+
+    Returns:
+    - list of dict: A list of sentence dictionaries, one for each predicate of each sentence (see expand_predicates).
+    """
+    return list(iter_data(file_type))
+
+def convert_data(file_type):
+    """
+    Converts a CoNLL-U file to the binary preprocessed corpus format (see corpus_format.write_corpus), so that the text only
+    needs to be parsed once. The corpus holds the sentences with their predicate copies, and is read by read_data, propbank
+    and the statistics scripts.
 
     Parameters:
-    - sentences (list of dict): A list of dictionaries, where each dictionary contains details of a sentence including its document 
-      ID ('DOC_ID'), sentence ID ('SENT_ID'), text ('SENT_TEXT'), predicate ID ('PRED_ID'), and annotated features ('FEATURES').
     - file_type (str): A string indicating the type of the data being converted (e.g., 'train', 'test', 'dev'), which is used to name 
-      the output file.
+      the output.
 
     Outputs:
-    - A new file named 'converted-{file_type}.conllu' in the 'data' directory containing the converted sentences.
+    - A new directory named 'converted-{file_type}.srl' in the 'data' directory containing the converted sentences.
     
     """
-    with open(f'data/converted-{file_type}.conllu', 'w', encoding='utf-8') as f:
-        for sentence in tqdm(sentences):
-            f.write('\n' + sentence['DOC_ID'] + '\n')
-            f.write('sent_id = ' + sentence['DOC_ID'] + '-' + sentence['SENT_ID'] + '\n')
-            f.write(sentence['SENT_TEXT'] + '\n')
-            f.write(sentence['PRED_ID'] + '\n')
-            for tokens in sentence['FEATURES']:
-                f.write('\t'.join(tokens.values()) + '\n')
-            
+    from tqdm import tqdm
+
+    file_path = find_data(file_type)
+    metadata = write_corpus(tqdm(iter_conllu(file_path)), corpus_path(file_type), file_path)
 
-    print(f'\n The dataset is saved in data/converted-{file_type}.conllu')
+    print(f"\n The dataset ({metadata['sentences']} sentences, {metadata['predicates']} predicates) is saved in {corpus_path(file_type)}")
 
 if __name__ == "__main__":
     # Prompt the user to select the file type
@@ -115,7 +177,6 @@ if __name__ == "__main__":
     idx = int(input("Please provide the index: "))
     file_type = file_types[idx-1]
 
-    print('\n Loading data...')
-    sentences = read_data(file_type)
-    convert_data(sentences, file_type)
+    print('\n Converting data...')
+    convert_data(file_type)
 
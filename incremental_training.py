@@ -0,0 +1,182 @@
+import time
+import numpy as np
+from sklearn.base import clone
+
+
+def extend_vectorizer(vectorizer, features):
+    """
+    Extends the vocabulary of a fitted DictVectorizer with the feature names that it has not seen yet.
+    New feature names are appended after the existing ones, so the columns of the old vocabulary keep their index.
+
+    Parameters:
+    - vectorizer (DictVectorizer): A fitted vectorizer (a FeatureHasher is left as it is).
+    - features (list of dict): Feature dictionaries of the (enlarged) dataset.
+
+    Returns:
+    - int: The number of feature names that were added.
+    """
+    if not hasattr(vectorizer, 'vocabulary_'):
+        # A hashing space (FeatureHasher) has a fixed number of columns, there is nothing to extend
+        return 0
+
+    added = 0
+    for token in features:
+        for key, value in token.items():
+            # Mirror DictVectorizer: strings and iterables of strings become 'key=value' indicator features
+            if isinstance(value, str):
+                names = [f'{key}{vectorizer.separator}{value}']
+            elif isinstance(value, (tuple, list)):
+                names = [f'{key}{vectorizer.separator}{v}' for v in value]
+            else:
+                names = [key]
+            for name in names:
+                if name not in vectorizer.vocabulary_:
+                    vectorizer.vocabulary_[name] = len(vectorizer.feature_names_)
+                    vectorizer.feature_names_.append(name)
+                    added += 1
+
+    return added
+
+
+def vectorizer_width(vectorizer):
+    """
+    Gets the number of columns that a token feature vectorizer produces.
+
+    Parameters:
+    - vectorizer (DictVectorizer, FeatureHasher or dict): A fitted vectorizer, or the vocabulary of the encoded mode.
+
+    Returns:
+    - int: The number of columns.
+    """
+    if isinstance(vectorizer, dict):
+        return len(vectorizer['FEATURE_NAMES'])
+    if hasattr(vectorizer, 'vocabulary_'):
+        return len(vectorizer.feature_names_)
+    return vectorizer.n_features
+
+
+def extend_pred_vectorizer(pred_vectorizer, args):
+    """
+    Extends the vocabulary of a fitted CountVectorizer with unseen PropBank argument terms, keeping old column indices.
+
+    Parameters:
+    - pred_vectorizer (CountVectorizer): A fitted vectorizer (a HashingVectorizer is left as it is).
+    - args (list of str): Argument strings of the (enlarged) dataset.
+
+    Returns:
+    - int: The number of terms that were added.
+    """
+    if not hasattr(pred_vectorizer, 'vocabulary_'):
+        # A HashingVectorizer has a fixed number of columns
+        return 0
+
+    analyzer = pred_vectorizer.build_analyzer()
+    added = 0
+    for doc in args:
+        for term in analyzer(doc):
+            if term not in pred_vectorizer.vocabulary_:
+                pred_vectorizer.vocabulary_[term] = len(pred_vectorizer.vocabulary_)
+                added += 1
+
+    return added
+
+
+def grow_model(model, n_features, labels):
+    """
+    Grows the coefficient matrix of a fitted LogisticRegression model to a larger feature space and label set.
+    Weights of known features and labels are copied over, new columns and rows start at zero.
+
+    Parameters:
+    - model (LogisticRegression): The previously trained model.
+    - n_features (int): Number of columns of the enlarged feature matrix.
+    - labels (list): Gold labels of the enlarged dataset.
+
+    Returns:
+    - tuple: The new coefficient matrix and intercept vector, ordered like the classes sklearn will derive from the labels.
+    """
+    if model.coef_.shape[1] > n_features:
+        raise ValueError(f'The model has {model.coef_.shape[1]} features, the feature space can only grow to refresh it.')
+
+    classes = np.unique(labels)  # sklearn sorts the classes the same way
+    old_coef = model.coef_
+    old_intercept = model.intercept_
+
+    # A binary model only stores the weights of the positive class
+    if old_coef.shape[0] == 1 and len(classes) > 2:
+        old_coef = np.vstack([-old_coef / 2, old_coef / 2])
+        old_intercept = np.concatenate([-old_intercept / 2, old_intercept / 2])
+
+    n_rows = 1 if len(classes) == 2 else len(classes)
+    coef = np.zeros((n_rows, n_features))
+    intercept = np.zeros(n_rows)
+
+    if n_rows == 1:
+        if list(model.classes_) == list(classes):
+            coef[0, :old_coef.shape[1]] = old_coef[0]
+            intercept[0] = old_intercept[0]
+        return coef, intercept
+
+    positions = {label: i for i, label in enumerate(classes)}
+    for old_row, label in enumerate(model.classes_):
+        # Labels that disappeared from the data are dropped
+        if label in positions:
+            coef[positions[label], :old_coef.shape[1]] = old_coef[old_row]
+            intercept[positions[label]] = old_intercept[old_row]
+
+    return coef, intercept
+
+
+def refresh_model(model, train_data, train_labels, compare_cold=False):
+    """
+    Warm-starts a trained logistic regression model on the enlarged training data.
+
+    Parameters:
+    - model (LogisticRegression): The previously trained model.
+    - train_data: Feature matrix of the enlarged training data, vectorized with the extended vectorizer.
+    - train_labels: Labels of the enlarged training data.
+    - compare_cold (bool): Whether to also fit a model from scratch to compare wall-clock time and convergence.
+
+    Returns:
+    - tuple: The refreshed model and a dictionary with the timing and convergence report.
+    """
+    coef, intercept = grow_model(model, train_data.shape[1], train_labels)
+
+    warm_model = clone(model).set_params(warm_start=True)
+    warm_model.coef_ = coef
+    warm_model.intercept_ = intercept
+
+    start = time.perf_counter()
+    warm_model.fit(train_data, train_labels)
+    report = {
+        'warm_seconds': time.perf_counter() - start,
+        'warm_iterations': int(np.max(warm_model.n_iter_)),
+        'max_iter': warm_model.max_iter,
+    }
+    report['warm_converged'] = report['warm_iterations'] < warm_model.max_iter
+    # Store the refreshed model like a cold-trained one
+    warm_model.set_params(warm_start=False)
+
+    if compare_cold:
+        cold_model = clone(model).set_params(warm_start=False)
+        start = time.perf_counter()
+        cold_model.fit(train_data, train_labels)
+        report['cold_seconds'] = time.perf_counter() - start
+        report['cold_iterations'] = int(np.max(cold_model.n_iter_))
+        report['cold_converged'] = report['cold_iterations'] < cold_model.max_iter
+
+    return warm_model, report
+
+
+def print_refresh_report(report):
+    """
+    Prints the timing and convergence report of a warm-started refit.
+
+    Parameters:
+    - report (dict): The report returned by refresh_model.
+    """
+    print(f"Warm refit: {report['warm_seconds']:.2f}s, {report['warm_iterations']} iterations "
+          f"({'converged' if report['warm_converged'] else 'not converged'} within {report['max_iter']})")
+    if 'cold_seconds' in report:
+        print(f"Cold fit:   {report['cold_seconds']:.2f}s, {report['cold_iterations']} iterations "
+              f"({'converged' if report['cold_converged'] else 'not converged'} within {report['max_iter']})")
+        print(f"Warm refit took {report['warm_seconds'] / report['cold_seconds']:.1%} of the cold fit time")
@@ -1,76 +1,264 @@
+import time
+start_time = time.perf_counter()
+
+# Heavy dependencies (spaCy, NLTK, gensim, plotting, most of sklearn) are imported by the functions that need them,
+# so that e.g. evaluating a trained model does not pay for loading them
 from context_features import extract_pred_features
 from ner_features import extract_ner_features
 from semantic_features import extract_semantic_features
-from get_data import read_data
+from get_data import read_data, iter_data, convert_data
+from corpus_format import corpus_path, load_corpus, corpus_matches_source, predicate_frames
 from dependency_features import extract_dependency_features
-from sklearn.feature_extraction import DictVectorizer
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report, confusion_matrix
-import propbank
 import pickle
-import numpy as np
-from tqdm import tqdm
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from scipy.sparse import hstack  # Changed from np.hstack to hstack to handle sparse matrices
+import sys
+import argparse
+from encoding import new_vocabulary, new_encoded_features, encode_token, build_design_matrix
+from embedding_features import EMBEDDINGS_PATH, new_embedding_rows, extract_embedding_features, build_embedding_block, embedding_feature_names
+from ablation import column_groups
+from evaluation import new_confusion, update_confusion, write_evaluation, iter_matrix_chunks
+import numpy as np
+from itertools import islice
+from scipy.sparse import hstack, vstack  # Changed from np.hstack to hstack to handle sparse matrices
+
+import_seconds = time.perf_counter() - start_time
 
+# Dependencies that should only be imported by the code paths that use them
+HEAVY_DEPENDENCIES = ['spacy', 'nltk', 'gensim', 'matplotlib', 'seaborn', 'pandas', 'sklearn.feature_extraction', 'tqdm']
 
-def extract_features(dataset, vectorizer, pred_vectorizer):
+
+def prepare_dataset(dataset):
     """
-    Extracts features for the given dataset using the provided vectorizers. 
+    Makes sure the binary corpus and the PropBank predicates of the given dataset exist, and loads the predicates.
     
     Parameters:
     - dataset (str): The name of the dataset ('train' or 'test').
-    - vectorizer (DictVectorizer): Vectorizer for converting feature dictionaries into feature vectors.
-    - pred_vectorizer (CountVectorizer): Vectorizer for converting predicate arguments into feature vectors.
     
     Returns:
-        tuple: Tuple containing feature matrix, gold labels, vectorizer, and predicate vectorizer.
+        dict: The roles and arguments of every predicate frame in the dataset.
     """
-    raw_sentences = read_data(dataset)
+    # Parse the CoNLL-U file once, later runs load the binary corpus until the CoNLL-U file changes
+    old_frames = None
+    if not os.path.exists(corpus_path(dataset)) or not corpus_matches_source(corpus_path(dataset)):
+        if os.path.exists(corpus_path(dataset)):
+            old_frames = set(predicate_frames(load_corpus(corpus_path(dataset))))
+        convert_data(dataset)
     
     if not os.path.exists(f'predicates/{dataset}.pkl'):
+        import propbank
+
         propbank.main(dataset)
-    
+    elif old_frames is not None:
+        # Changed data can have new frames, only those are looked up in PropBank. Frames that PropBank has no instance of
+        # are never in the predicates, so they are only looked up when they first appear in the data
+        with open(f'predicates/{dataset}.pkl', "rb") as f:
+            preds_dict = pickle.load(f)
+        missing = [frame for frame in predicate_frames(load_corpus(corpus_path(dataset)))
+                   if frame not in preds_dict and frame not in old_frames]
+        if missing:
+            import propbank
+
+            propbank.add_predicates(dataset, missing)
+
     with open(f'predicates/{dataset}.pkl', "rb") as f:
         preds_dict = pickle.load(f)
 
-    features = []
+    return preds_dict
+
+
+def load_frame_arguments(dataset):
+    """
+    Loads the numbered arguments of the roleset of every frame in the dataset, for constrained decoding. Frames that are
+    not in predicates/{dataset}_arguments.pkl yet are looked up in PropBank and added to it, so only this needs NLTK.
+    
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    
+    Returns:
+        dict: The numbered arguments of the roleset of every frame, e.g. {'post.01': ['ARG0', 'ARG1', 'ARG2']}.
+    """
+    prepare_dataset(dataset)
+    frames = predicate_frames(load_corpus(corpus_path(dataset)))
+
+    frame_args = {}
+    if os.path.exists(f'predicates/{dataset}_arguments.pkl'):
+        with open(f'predicates/{dataset}_arguments.pkl', "rb") as f:
+            frame_args = pickle.load(f)
+
+    if any(frame not in frame_args for frame in frames):
+        import propbank
+
+        frame_args = propbank.save_roleset_arguments(dataset, frames)
+
+    return frame_args
+
+
+def extract_sentence_features(sent, preds_dict, embedding_rows=None, embeddings=None, doc=None):
+    """
+    Extracts the features of every token of a sentence (one predicate).
+    
+    Parameters:
+    - sent (dict): The sentence, as returned by read_data.
+    - preds_dict (dict): The roles and arguments of every predicate frame.
+    - embedding_rows (dict): The embedding rows to append the tokens to, see embedding_features.new_embedding_rows (optional).
+    - embeddings (str): Path to memory-mapped KeyedVectors embeddings, used with embedding_rows (optional).
+    - doc (spacy.tokens.Doc): The sentence text already parsed by spaCy, e.g. by the pipelined mode (optional).
+    
+    Returns:
+        tuple: Tuple containing the feature dictionaries, gold labels, argument strings and PropBank arguments of the tokens.
+    """
+    # Extract different features
+    sent_features = extract_ner_features(sent, doc)
+    sent_features = extract_pred_features(sent_features)
+    sent_features = extract_semantic_features(sent_features, doc)
+    sent_features = extract_dependency_features(sent_features)
+    if embeddings:
+        extract_embedding_features(sent_features, embedding_rows, embeddings)
+
     golds = []
     args = []
     args2feat = []
-
-    for sent in tqdm(raw_sentences):
-        # Extract different features
-        sent_features = extract_ner_features(sent)
-        sent_features = extract_pred_features(sent_features)
-        sent_features = extract_semantic_features(sent_features)
-        sent_features = extract_dependency_features(sent_features)
+    for token in sent_features['FEATURES']:
+        # Get labels out, and delete from the data
+        golds.append(token['ROLE'])
+        for key in ['ROLE', 'LEMMA', 'TOKEN', 'PRED', 'DEPHEAD', 'TOKEN_ID', 'PRED_ID']:
+            if key in token:
+                del token[key]
         
-        for token in sent_features['FEATURES']:
-            # Get labels out, and delete from the data
-            golds.append(token['ROLE'])
-            for key in ['ROLE', 'LEMMA', 'TOKEN', 'PRED', 'DEPHEAD', 'TOKEN_ID', 'PRED_ID']:
-                if key in token:
-                    del token[key]
-            
-            # Get the arguments from propbank
-            try:
-                token_args = [a for a in preds_dict[sent['PRED_FRAME']] if 'arg' in a.lower()]
-                args2feat.extend(token_args)
-                args.append(' '.join(token_args))
-            except KeyError:
-                args.append("")
-                
-            features.append(token)
-    
-    if dataset == 'train':
-        feature_matrix = vectorizer.fit_transform(features)
-        pred_vectorizer = pred_vectorizer.fit(args2feat)
+        # Get the arguments from propbank
+        try:
+            token_args = [a for a in preds_dict[sent['PRED_FRAME']] if 'arg' in a.lower()]
+            args2feat.extend(token_args)
+            args.append(' '.join(token_args))
+        except KeyError:
+            args.append("")
+
+    return sent_features['FEATURES'], golds, args, args2feat
+
+
+def collect_features(dataset, vocabulary=None, grow=False, embeddings=None, pipeline=None, start=0):
+    """
+    Reads the given dataset and collects the feature dictionaries, gold labels and PropBank arguments of every token.
+    In the encoded mode (when a vocabulary is given), the sentences are streamed and the features of every token are encoded
+    into integer columns right after extraction, instead of keeping a feature dictionary per token.
+    
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    - vocabulary (dict): Vocabulary for the encoded mode, see encoding.new_vocabulary (optional).
+    - grow (bool): Whether unseen feature values are added to the vocabulary in the encoded mode.
+    - embeddings (str): Path to memory-mapped KeyedVectors embeddings, to also look up lemma and predicate embeddings (optional).
+    - pipeline (dict): Options of the pipelined mode (see pipeline.iter_pipelined_features), to read, parse and extract the
+      sentences in concurrent stages (optional).
+    - start (int): The number of predicate copies at the start of the dataset to leave out, e.g. those that were already
+      extracted (without pipeline only).
+    
+    Returns:
+        tuple: Tuple containing the feature dictionaries (or encoded columns), gold labels, argument strings per token, all arguments for fitting and the embedding rows of every token (None without embeddings).
+    """
+    preds_dict = prepare_dataset(dataset)
+
+    features = [] if vocabulary is None else new_encoded_features()
+    golds = []
+    args = []
+    args2feat = []
+    embedding_rows = new_embedding_rows() if embeddings else None
+
+    if pipeline is None:
+        from tqdm import tqdm
+
+        if start:
+            raw_sentences = islice(iter_data(dataset), start, None)
+        else:
+            raw_sentences = read_data(dataset) if vocabulary is None else iter_data(dataset)
+        results = (extract_sentence_features(sent, preds_dict, embedding_rows, embeddings)
+                   for sent in tqdm(raw_sentences, disable=vocabulary is not None))
     else:
-        feature_matrix = vectorizer.transform(features)
+        from pipeline import iter_pipelined_features
+
+        results = iter_pipelined_features(extract_sentence_features, dataset, preds_dict, embedding_rows, embeddings, **pipeline)
+
+    for tokens, sent_golds, sent_args, sent_args2feat in results:
+        golds.extend(sent_golds)
+        args.extend(sent_args)
+        args2feat.extend(sent_args2feat)
+
+        if vocabulary is None:
+            features.extend(tokens)
+        else:
+            for token in tokens:
+                encode_token(token, vocabulary, features, grow)
+
+    return features, golds, args, args2feat, embedding_rows
+
+
+def compact_matrix(matrix):
+    """
+    Converts a sparse feature matrix to float32 values and int32 indices, which is all the (mostly 0/1) features need.
+    
+    Parameters:
+    - matrix: The sparse feature matrix.
+    
+    Returns:
+        scipy.sparse.csr_matrix: The compact matrix (the same matrix if it already is compact).
+    """
+    matrix = matrix.tocsr().astype(np.float32, copy=False)
+    if matrix.nnz < np.iinfo(np.int32).max:
+        matrix.indices = matrix.indices.astype(np.int32, copy=False)
+        matrix.indptr = matrix.indptr.astype(np.int32, copy=False)
+    return matrix
+
+
+def report_matrix_memory(name, matrix):
+    """
+    Prints the memory of a compact sparse feature matrix, and how much it saves compared to the matrix built without --compact.
+    That matrix has the same int32 indices (the vectorizers and the encoded mode already use them), so only the values differ:
+    float64 instead of float32.
+    
+    Parameters:
+    name: The name of the matrix.
+    matrix: The sparse (CSR) feature matrix.
+    """
+    used = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    saved = matrix.data.size * (8 - matrix.data.itemsize)
+    print(f"{name} matrix: {used / 2**20:.1f} MiB ({matrix.dtype} values, {matrix.indices.dtype} indices), "
+          f"{saved / 2**20:.1f} MiB less than with float64 values")
+
+
+def extract_features(dataset, vectorizer, pred_vectorizer, embeddings=None, pipeline=None, compact=False):
+    """
+    Extracts features for the given dataset using the provided vectorizers. 
+    
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    - vectorizer (DictVectorizer or dict): Vectorizer for converting feature dictionaries into feature vectors, or a vocabulary 
+      (see encoding.new_vocabulary) to encode the features as integer IDs and build the feature matrix from them.
+    - pred_vectorizer (CountVectorizer): Vectorizer for converting predicate arguments into feature vectors.
+    - embeddings (str): Path to memory-mapped KeyedVectors embeddings, whose lemma and predicate embeddings are joined to the feature matrix as extra columns (optional).
+    - pipeline (dict): Options of the pipelined mode, see collect_features (optional).
+    - compact (bool): Whether to keep the feature matrix in float32 with int32 indices. The DictVectorizer and CountVectorizer
+      should then be created with dtype=np.float32 as well.
+    
+    Returns:
+        tuple: Tuple containing feature matrix, gold labels, vectorizer, and predicate vectorizer.
+    """
+    if isinstance(vectorizer, dict):
+        features, golds, args, args2feat, embedding_rows = collect_features(dataset, vectorizer, dataset == 'train', embeddings, pipeline)
+        feature_matrix = build_design_matrix(features, vectorizer, np.float32 if compact else np.float64)
+        if dataset == 'train':
+            pred_vectorizer = pred_vectorizer.fit(args2feat)
+    else:
+        features, golds, args, args2feat, embedding_rows = collect_features(dataset, embeddings=embeddings, pipeline=pipeline)
+        
+        if dataset == 'train':
+            feature_matrix = vectorizer.fit_transform(features)
+            pred_vectorizer = pred_vectorizer.fit(args2feat)
+        else:
+            feature_matrix = vectorizer.transform(features)
+
+    if embeddings:
+        feature_matrix = join_embeddings(feature_matrix, embedding_rows, embeddings)
+    if compact:
+        feature_matrix = compact_matrix(feature_matrix)
 
     args_features_matrix = pred_vectorizer.transform(args)
 
@@ -80,6 +268,110 @@ def extract_features(dataset, vectorizer, pred_vectorizer):
     return feature_matrix, golds, vectorizer, pred_vectorizer
 
 
+def join_embeddings(feature_matrix, embedding_rows, embeddings):
+    """
+    Joins the embeddings of the tokens to their sparse feature matrix.
+    The sparse features are cast to float32 first (their 0/1 values and small distances are exact), otherwise hstack would
+    upcast the embeddings to float64. The embedding values are stored as explicit entries of the CSR matrix, so every token
+    with all four (300-dimensional) embeddings adds 1200 entries of 8 bytes (float32 value and int32 index), about 9.4 KiB per row.
+    
+    Parameters:
+    - feature_matrix: The sparse feature matrix of the tokens.
+    - embedding_rows (dict): The embedding rows of the tokens, see embedding_features.new_embedding_rows.
+    - embeddings (str): Path to the memory-mapped KeyedVectors embeddings.
+    
+    Returns:
+        scipy.sparse.csr_matrix: The float32 feature matrix with the embedding columns after the sparse features.
+    """
+    block = build_embedding_block(embedding_rows, embeddings)
+    return hstack([feature_matrix.astype(np.float32, copy=False), block], format='csr')
+
+
+def vectorize_tokens(tokens, vectorizer, embedding_rows=None, embeddings=None):
+    """
+    Turns the feature dictionaries of tokens into a feature matrix with a fitted vectorizer, without changing it.
+    
+    Parameters:
+    - tokens (list of dict): The feature dictionaries of the tokens.
+    - vectorizer (DictVectorizer or dict): The fitted vectorizer, or the vocabulary of the encoded mode.
+    - embedding_rows (dict): The embedding rows of the tokens, see embedding_features.new_embedding_rows (optional).
+    - embeddings (str): Path to the embeddings to join to the feature matrix, used with embedding_rows (optional).
+    
+    Returns:
+        scipy.sparse.csr_matrix: The feature matrix of the tokens.
+    """
+    if isinstance(vectorizer, dict):
+        encoded = new_encoded_features()
+        for token in tokens:
+            encode_token(token, vectorizer, encoded, False)
+        feature_matrix = build_design_matrix(encoded, vectorizer)
+    else:
+        feature_matrix = vectorizer.transform(tokens)
+
+    if embeddings:
+        feature_matrix = join_embeddings(feature_matrix, embedding_rows, embeddings)
+    return feature_matrix
+
+
+def iter_extracted_chunks(dataset, vectorizer, chunk_size, embeddings=None):
+    """
+    Streams the given dataset and extracts its features in chunks of whole predicates, so that only one chunk is in memory.
+    
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    - vectorizer (DictVectorizer or dict): The fitted vectorizer, or the vocabulary of the encoded mode.
+    - chunk_size (int): The minimum number of tokens per chunk (the last chunk can be smaller).
+    - embeddings (str): Path to the embeddings the model was trained with (optional).
+    
+    Yields:
+        tuple: The feature matrix of the chunk, its gold labels, the predicate offsets within the chunk and the frames of its predicates.
+    """
+    preds_dict = prepare_dataset(dataset)
+    tokens, golds, predicate_offsets, frames = [], [], [0], []
+    embedding_rows = new_embedding_rows() if embeddings else None
+
+    for sent in iter_data(dataset):
+        sent_tokens, sent_golds, _, _ = extract_sentence_features(sent, preds_dict, embedding_rows, embeddings)
+        tokens.extend(sent_tokens)
+        golds.extend(sent_golds)
+        predicate_offsets.append(len(golds))
+        frames.append(sent.get('PRED_FRAME'))
+
+        if len(golds) >= chunk_size:
+            yield vectorize_tokens(tokens, vectorizer, embedding_rows, embeddings), golds, np.array(predicate_offsets), frames
+            tokens, golds, predicate_offsets, frames = [], [], [0], []
+            embedding_rows = new_embedding_rows() if embeddings else None
+
+    if golds:
+        yield vectorize_tokens(tokens, vectorizer, embedding_rows, embeddings), golds, np.array(predicate_offsets), frames
+
+
+def get_feature_names(vectorizer, embeddings=None):
+    """
+    Gets the name of every column of the feature matrix built by extract_features.
+    
+    Parameters:
+    - vectorizer (DictVectorizer or dict): The fitted vectorizer, or the vocabulary of the encoded mode.
+    - embeddings (str): Path to the embeddings whose columns were joined to the feature matrix (optional).
+    
+    Returns:
+        list: The name of every column.
+    """
+    feature_names = list(vectorizer['FEATURE_NAMES'] if isinstance(vectorizer, dict) else vectorizer.feature_names_)
+    if embeddings:
+        feature_names.extend(embedding_feature_names(embeddings))
+    return feature_names
+
+
+def new_model():
+    """
+    Creates the (unfitted) logistic regression model that is trained on the features.
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    return LogisticRegression(max_iter=1000, solver='lbfgs', multi_class='auto')
+
+
 def train_model(train_data, train_labels):
     """
     Trains a logistic regression model on the training data.
@@ -89,7 +381,7 @@ def train_model(train_data, train_labels):
     train_labels: Labels for the training data.
     """
     print("Training the logistic regression model...")
-    model = LogisticRegression(max_iter=1000, solver='lbfgs', multi_class='auto')
+    model = new_model()
     model.fit(train_data, train_labels)
 
     # Save the model to a file
@@ -97,20 +389,151 @@ def train_model(train_data, train_labels):
         pickle.dump(model, model_file)
 
 
-def load_and_evaluate(test_data, test_labels):
+def find_appended_predicates(saved_features, saved_labels, n_columns):
+    """
+    Finds where the sentences appended to the training data start, i.e. how many predicate copies of the training corpus
+    the saved training matrix already holds.
+    
+    Parameters:
+    saved_features: The saved training matrix (features/train.pkl).
+    saved_labels: The saved gold labels (features/train_labels.pkl).
+    n_columns: The number of columns of the saved vectorizer.
+    
+    Returns:
+        int: The number of predicate copies in the saved matrix, or None if its rows are not the start of the corpus (e.g.
+        sentences were changed instead of appended) or it has other columns (e.g. embeddings).
+    """
+    prepare_dataset('train')
+    corpus = load_corpus(corpus_path('train'))
+    role_offsets = np.asarray(corpus['role_offsets'])
+    n_rows = saved_features.shape[0]
+
+    start = int(np.searchsorted(role_offsets, n_rows))
+    if (saved_features.shape[1] != n_columns or len(saved_labels) != n_rows
+            or start == len(role_offsets) or role_offsets[start] != n_rows):
+        return None
+    strings = corpus['STRINGS']
+    if [strings[label] for label in np.asarray(corpus['role'][:n_rows]).tolist()] != list(saved_labels):
+        return None
+    return start
+
+
+def refresh_trained_model(compare_cold=False, compact=False):
+    """
+    Refreshes the trained logistic regression model on the appended training data instead of training it from scratch.
+    Only the appended sentences are extracted, and their rows are added to the saved training matrix. The saved vectorizers
+    are extended with the new features, and the model is warm-started from its previous weights.
+    
+    Parameters:
+    compare_cold: Whether to also fit a model from scratch and report the warm refit against it.
+    compact: Whether to keep the training matrix in float32 with int32 indices.
+    """
+    from incremental_training import extend_vectorizer, extend_pred_vectorizer, vectorizer_width, refresh_model, print_refresh_report
+
+    refresh_start = time.perf_counter()
+    with open('trained_logistic_regression_model.pkl', 'rb') as model_file:
+        model = pickle.load(model_file)
+    with open('features/vectorizers.pkl', 'rb') as f:
+        vectorizer, pred_vectorizer = pickle.load(f)
+    with open('features/train.pkl', 'rb') as f:
+        saved_features = pickle.load(f)
+    with open('features/train_labels.pkl', 'rb') as f:
+        saved_labels = pickle.load(f)
+
+    start = find_appended_predicates(saved_features, saved_labels, vectorizer_width(vectorizer))
+    if start is None:
+        print("The saved training features do not match the start of the training data, extracting all of it again...")
+        start, saved_features, saved_labels = 0, None, []
+
+    if isinstance(vectorizer, dict):
+        # New values get the next free columns of the vocabulary while they are encoded
+        n_features = len(vectorizer['FEATURE_NAMES'])
+        features, new_labels, args, _, _ = collect_features('train', vectorizer, grow=True, start=start)
+        n_added = len(vectorizer['FEATURE_NAMES']) - n_features
+        new_features = build_design_matrix(features, vectorizer, np.float32 if compact else np.float64)
+    else:
+        features, new_labels, args, _, _ = collect_features('train', start=start)
+        n_added = extend_vectorizer(vectorizer, features)
+        new_features = vectorizer.transform(features)
+    print(f"Extracted {len(new_labels)} new tokens, added {n_added} features and "
+          f"{extend_pred_vectorizer(pred_vectorizer, args)} PropBank arguments to the vocabulary")
+
+    if saved_features is None:
+        train_features = new_features
+    else:
+        # The saved rows only need the new (empty) columns of the extended vocabulary
+        saved_features = saved_features.tocsr()
+        saved_features.resize((saved_features.shape[0], new_features.shape[1]))
+        train_features = vstack([saved_features, new_features], format='csr')
+    train_labels = list(saved_labels) + new_labels
+    if compact:
+        train_features = compact_matrix(train_features)
+
+    print("Refreshing the logistic regression model...")
+    model, report = refresh_model(model, train_features, train_labels, compare_cold)
+    print_refresh_report(report)
+
+    with open('trained_logistic_regression_model.pkl', 'wb') as model_file:
+        pickle.dump(model, model_file)
+    with open('features/vectorizers.pkl', 'wb') as f:
+        pickle.dump((vectorizer, pred_vectorizer), f)
+    with open('features/train.pkl', 'wb') as f:
+        pickle.dump(train_features, f)
+    with open('features/train_labels.pkl', 'wb') as f:
+        pickle.dump(train_labels, f)
+    # Hashed columns (sharded extraction) have no names to group
+    if isinstance(vectorizer, dict) or hasattr(vectorizer, 'feature_names_'):
+        with open('features/column_groups.pkl', 'wb') as f:
+            pickle.dump(column_groups(get_feature_names(vectorizer)), f)
+
+    # The test data did not change, its matrix only needs the new (empty) columns of the extended vocabulary
+    with open('features/test.pkl', 'rb') as f:
+        test_features = pickle.load(f)
+    test_features.resize((test_features.shape[0], train_features.shape[1]))
+    with open('features/test.pkl', 'wb') as f:
+        pickle.dump(test_features, f)
+
+    print(f"Refreshed the model in {time.perf_counter() - refresh_start:.1f}s")
+
+
+def load_test_predicates():
+    """
+    Loads where the tokens of every predicate start in the test feature matrix, and the PropBank frame of every predicate.
+    The tokens are in the order of the binary test corpus, which the test features were extracted from.
+    
+    Returns:
+        tuple: Tuple containing the predicate offsets, the frame of every predicate, and the numbered arguments of the roleset of every frame.
+    """
+    corpus = load_corpus(corpus_path('test'))
+    frames = [corpus['STRINGS'][frame] if frame != -1 else None for frame in corpus['predicate_pred_frame']]
+    return np.asarray(corpus['role_offsets']), frames, load_frame_arguments('test')
+
+
+def load_and_evaluate(test_data, test_labels, constrained=False):
     """
     Loads a pre-trained logistic regression model and evaluates it on the test data.
     
     Parameters:
     test_data: Feature matrix for the test data.
     test_labels: Labels for the test data.
+    constrained: Whether to restrict the labels of every predicate to those its PropBank frame allows, with unique numbered arguments.
     """    
+    from sklearn.metrics import classification_report
+
     with open('trained_logistic_regression_model.pkl', 'rb') as model_file:
         model = pickle.load(model_file)
 
     # Predict on the test set
     print("Predicting on the test set...")
-    predictions = model.predict(test_data)
+    if constrained:
+        from constrained_decoding import constrained_predict
+
+        predicate_offsets, frames, frame_args = load_test_predicates()
+        if predicate_offsets[-1] != test_data.shape[0]:
+            raise ValueError('The test features do not match the test corpus, extract the features again.')
+        predictions = constrained_predict(model, test_data, predicate_offsets, frames, frame_args)
+    else:
+        predictions = model.predict(test_data)
 
     # Evaluate the model
     print("Evaluating the model...")
@@ -120,6 +543,43 @@ def load_and_evaluate(test_data, test_labels):
 
     
 
+def evaluate_in_chunks(chunks, constrained=False, output_dir='evaluation', image=True):
+    """
+    Evaluates the pre-trained logistic regression model chunk by chunk. Only the confusion counts are kept between chunks,
+    so memory does not grow with the size of the test data. The report and confusion matrix are written to disk instead
+    of being shown.
+    
+    Parameters:
+    chunks: The feature matrix, gold labels, predicate offsets and frames of every chunk, see iter_matrix_chunks and iter_extracted_chunks.
+    constrained: Whether to restrict the labels of every predicate to those its PropBank frame allows, with unique numbered arguments.
+    output_dir: The directory to write the report and confusion matrix to.
+    image: Whether to also save the confusion matrix as an image.
+    """
+    with open('trained_logistic_regression_model.pkl', 'rb') as model_file:
+        model = pickle.load(model_file)
+
+    if constrained:
+        from constrained_decoding import constrained_predict
+
+        frame_args = load_frame_arguments('test')
+
+    print("Predicting on the test set in chunks...")
+    confusion = new_confusion(model.classes_)
+    n_tokens = 0
+    for data, labels, predicate_offsets, frames in chunks:
+        if constrained:
+            predictions = constrained_predict(model, data, predicate_offsets, frames, frame_args)
+        else:
+            predictions = model.predict(data)
+        update_confusion(confusion, labels, predictions)
+        n_tokens += len(labels)
+        print(f"Evaluated {n_tokens} tokens", end='\r')
+
+    report = write_evaluation(confusion, output_dir, image)
+    print("\nClassification Report:\n", report)
+    print(f"\n The report and confusion matrix are saved in {output_dir}/")
+
+
 def plot_confusion_matrix(test_labels, predictions, classes):
     """
     Plots a confusion matrix using the actual and predicted labels.
@@ -129,6 +589,10 @@ def plot_confusion_matrix(test_labels, predictions, classes):
     predictions: Predicted labels by the model.
     classes: List of unique class labels.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from sklearn.metrics import confusion_matrix
+
     cm = confusion_matrix(test_labels, predictions, labels=classes)
     plt.figure(figsize=(20, 20))
     sns.heatmap(cm, annot=True, fmt="d", xticklabels=classes, yticklabels=classes)
@@ -141,13 +605,91 @@ def plot_confusion_matrix(test_labels, predictions, classes):
     plt.colorbar()  # Add a colorbar to a plot
     plt.show()
 
+
+def report_timings(run_seconds):
+    """
+    Prints how long the imports at startup and the whole run took, and which heavy dependencies were imported.
+    
+    Parameters:
+    run_seconds: Wall-clock time of the run after startup.
+    """
+    loaded = [name for name in HEAVY_DEPENDENCIES if name in sys.modules]
+    print(f"Startup imports: {import_seconds:.3f}s")
+    print(f"Run: {run_seconds:.3f}s")
+    print(f"Heavy dependencies imported: {', '.join(loaded) if loaded else 'none'}")
+
 if __name__ == "__main__":
-    vectorizer = DictVectorizer(sparse=True)
-    pred_vectorizer = CountVectorizer()
+    parser = argparse.ArgumentParser(description='Logistic Regression for Semantic Role Labeling')
+    parser.add_argument('--refresh', action='store_true',
+                        help='warm-start the trained model on the appended training data instead of training from scratch')
+    parser.add_argument('--compare-cold', action='store_true',
+                        help='with --refresh, also fit a model from scratch and compare time and convergence')
+    parser.add_argument('--encoded', action='store_true',
+                        help='encode the token features as integer IDs while extracting them, instead of using a DictVectorizer')
+    parser.add_argument('--embeddings', nargs='?', const=EMBEDDINGS_PATH, default=None, metavar='PATH',
+                        help=f'add lemma and predicate embeddings from memory-mapped KeyedVectors (default: {EMBEDDINGS_PATH})')
+    parser.add_argument('--timings', action='store_true',
+                        help='report the import time at startup, the run time and the heavy dependencies that were imported')
+    parser.add_argument('--constrained', action='store_true',
+                        help='restrict the predicted roles of every predicate to the arguments of its PropBank frame and the modifiers')
+    parser.add_argument('--ablation', action='store_true',
+                        help='train and evaluate leave-one-group-out and single-group models on the cached feature matrices')
+    parser.add_argument('--workers', type=int, default=-1,
+                        help='number of models trained in parallel with --ablation (default: all CPUs)')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='extract the features with reading, spaCy parsing and feature extraction running as concurrent stages')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help='with --pipelined, number of sentences per batch (default: 64)')
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='with --pipelined, number of batches in flight (default: 8)')
+    parser.add_argument('--extract-workers', type=int, default=2,
+                        help='with --pipelined, number of feature extractor threads (default: 2)')
+    parser.add_argument('--compact', action='store_true',
+                        help='keep the feature matrices in float32 with int32 indices instead of float64, and report the memory saved')
+    parser.add_argument('--chunk-size', type=int, default=None, metavar='N',
+                        help='evaluate in chunks of at least N tokens, and write the report and confusion matrix to --evaluation-dir')
+    parser.add_argument('--stream-test', action='store_true',
+                        help='with --chunk-size, extract the test features chunk by chunk with the saved vectorizers instead of loading features/test.pkl')
+    parser.add_argument('--evaluation-dir', default='evaluation',
+                        help='directory for the report and confusion matrix of the chunked evaluation (default: evaluation)')
+    parser.add_argument('--no-image', action='store_true',
+                        help='with --chunk-size, only write the confusion matrix as CSV')
+    cli_args = parser.parse_args()
+    if cli_args.refresh and cli_args.embeddings:
+        parser.error('--refresh cannot grow a model with embedding features, train it from scratch instead')
+    if cli_args.stream_test and not cli_args.chunk_size:
+        parser.error('--stream-test needs --chunk-size')
+
+    run_start_time = time.perf_counter()
     model_path = 'trained_logistic_regression_model.pkl'
 
+    if cli_args.ablation:
+        if not all(os.path.exists(f'features/{name}.pkl') for name in ['train', 'train_labels', 'test', 'test_labels', 'column_groups']):
+            raise FileNotFoundError('The ablation study needs the cached feature matrices, run without --ablation first.')
+        from ablation import run_ablation, write_ablation_results
+
+        with open('features/column_groups.pkl', 'rb') as f:
+            groups = pickle.load(f)
+        with open('features/train.pkl', 'rb') as f:
+            train_features = pickle.load(f)
+        with open('features/train_labels.pkl', 'rb') as f:
+            train_labels = pickle.load(f)
+        with open('features/test.pkl', 'rb') as f:
+            test_features = pickle.load(f)
+        with open('features/test_labels.pkl', 'rb') as f:
+            test_labels = pickle.load(f)
+
+        print(f"Running the ablation study over {len(groups)} feature groups...")
+        results = run_ablation(new_model(), train_features, train_labels, test_features, test_labels, groups, cli_args.workers)
+        write_ablation_results(results, 'ablation_results.csv')
+
+    elif cli_args.refresh:
+        if not os.path.exists(model_path) or not os.path.exists('features/vectorizers.pkl'):
+            raise FileNotFoundError('Refreshing needs a trained model and the saved vectorizers, run without --refresh first.')
+        refresh_trained_model(cli_args.compare_cold, cli_args.compact)
+
     # Check if the trained model file already exists
-    if not os.path.exists(model_path):
+    elif not os.path.exists(model_path):
         
         # Check if features are already extracted
         if os.path.exists('features/train.pkl') and os.path.exists('features/train_labels.pkl') and os.path.exists('features/test.pkl') and os.path.exists('features/test_labels.pkl'):
@@ -165,23 +707,64 @@ if __name__ == "__main__":
 
         else:
             print("Model file and feature datasets not found, starting feature extracting and model training...")
+            from sklearn.feature_extraction import DictVectorizer
+            from sklearn.feature_extraction.text import CountVectorizer
+
+            dtype = np.float32 if cli_args.compact else np.float64
+            vectorizer = new_vocabulary() if cli_args.encoded else DictVectorizer(sparse=True, dtype=dtype)
+            pred_vectorizer = CountVectorizer(dtype=dtype)
         
-            train_features, train_labels, vectorizer, pred_vectorizer = extract_features('train', vectorizer, pred_vectorizer)
-            test_features, test_labels, vectorizer, pred_vectorizer = extract_features('test', vectorizer, pred_vectorizer)
+            pipeline = None
+            if cli_args.pipelined:
+                pipeline = {'batch_size': cli_args.batch_size, 'queue_size': cli_args.queue_size, 'workers': cli_args.extract_workers}
 
-            with open(f'features/train.pkl', 'rb') as f:
+            train_features, train_labels, vectorizer, pred_vectorizer = extract_features('train', vectorizer, pred_vectorizer, cli_args.embeddings, pipeline, cli_args.compact)
+            test_features, test_labels, vectorizer, pred_vectorizer = extract_features('test', vectorizer, pred_vectorizer, cli_args.embeddings, pipeline, cli_args.compact)
+            if cli_args.compact:
+                report_matrix_memory('Training', train_features)
+                report_matrix_memory('Test', test_features)
+                print("The lbfgs solver fits on a float64 copy of the training matrix, so peak memory while training is the "
+                      "float32 matrix plus that copy, higher than without --compact.")
+
+            os.makedirs('features', exist_ok=True)
+            with open('features/vectorizers.pkl', 'wb') as f:
+                pickle.dump((vectorizer, pred_vectorizer), f)
+            # Record which columns belong to which feature group, for the ablation study
+            with open('features/column_groups.pkl', 'wb') as f:
+                pickle.dump(column_groups(get_feature_names(vectorizer, cli_args.embeddings)), f)
+            with open(f'features/train.pkl', 'wb') as f:
                 pickle.dump(train_features, f)
-            with open(f'features/train_labels.pkl', 'rb') as f:
+            with open(f'features/train_labels.pkl', 'wb') as f:
                 pickle.dump(train_labels, f)
 
-            with open(f'features/test.pkl', 'rb') as f:
+            with open(f'features/test.pkl', 'wb') as f:
                 pickle.dump(test_features, f)
-            with open(f'features/test_labels.pkl', 'rb') as f:
+            with open(f'features/test_labels.pkl', 'wb') as f:
                 pickle.dump(test_labels, f)
 
         # Train and evaluate the logistic regression model
         train_model(train_features, train_labels)
 
+    elif cli_args.chunk_size:
+        print("Model file found, loading model and evaluating in chunks...")
+
+        if cli_args.stream_test:
+            # Nothing is cached, only the vectorizers fitted on the training data are needed
+            with open('features/vectorizers.pkl', 'rb') as f:
+                vectorizer, _ = pickle.load(f)
+            chunks = iter_extracted_chunks('test', vectorizer, cli_args.chunk_size, cli_args.embeddings)
+        else:
+            with open(f'features/test.pkl', 'rb') as f:
+                test_features = pickle.load(f)
+            with open(f'features/test_labels.pkl', 'rb') as f:
+                test_labels = pickle.load(f)
+            predicate_offsets, frames, _ = load_test_predicates()
+            if predicate_offsets[-1] != test_features.shape[0]:
+                raise ValueError('The test features do not match the test corpus, extract the features again.')
+            chunks = iter_matrix_chunks(test_features.tocsr(), test_labels, predicate_offsets, frames, cli_args.chunk_size)
+
+        evaluate_in_chunks(chunks, cli_args.constrained, cli_args.evaluation_dir, not cli_args.no_image)
+
     else:
         print("Model file found, loading model and evaluating...")
         
@@ -193,7 +776,10 @@ if __name__ == "__main__":
         
         
         # Load and evaluate the logistic regression model
-        load_and_evaluate(test_features, test_labels)
+        load_and_evaluate(test_features, test_labels, cli_args.constrained)
+
+    if cli_args.timings:
+        report_timings(time.perf_counter() - run_start_time)
 
 
     
@@ -1,23 +1,21 @@
 from get_data import read_data
-import spacy
+from spacy_model import load_nlp
 
-# Load the small English model
-nlp = spacy.load("en_core_web_sm")
-
-def extract_ner_features(sent):
+def extract_ner_features(sent, doc=None):
     """
     Extracts Named Entity Recognition (NER) features from a given sentence.
 
     Parameters:
     - sent (dict): A dictionary representing a sentence containing linguistic annotations and metadata, including the text of the 
       sentence ('SENT_TEXT') and features ('FEATURES') such as tokenization and part-of-speech tagging.
+    - doc (spacy.tokens.Doc): The sentence text already parsed by spaCy, e.g. in a batch (optional).
 
     Returns:
     - dict: The input sentence dictionary updated with NER features.
     """
        
     # Process the text with the Spacy NLP model
-    doc = nlp(sent['SENT_TEXT'])
+    doc = load_nlp()(sent['SENT_TEXT']) if doc is None else doc
 
     # Initialize an empty list to hold the BIO tags
     bio_tags = ["O"] * len(doc)
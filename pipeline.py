@@ -0,0 +1,220 @@
+import queue
+import threading
+
+# Put in a queue when a stage has no more batches. A stage that fails puts its exception in the queue instead, which is
+# passed down the pipeline and raised again by the consumer
+END = object()
+
+# How long a stage waits on a queue or a free slot before it checks again whether the pipeline was stopped
+POLL_SECONDS = 0.1
+
+
+def put(outbox, item, stop):
+    """
+    Puts an item in a queue, waiting while the queue is full, unless the pipeline is stopped.
+
+    Parameters:
+    - outbox (queue.Queue): The queue to put the item in.
+    - item: The item.
+    - stop (threading.Event): Set when the consumer stops reading from the pipeline.
+
+    Returns:
+    - bool: Whether the item was put in the queue.
+    """
+    while not stop.is_set():
+        try:
+            outbox.put(item, timeout=POLL_SECONDS)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def get(inbox, stop):
+    """
+    Gets an item from a queue, waiting while the queue is empty, unless the pipeline is stopped.
+
+    Parameters:
+    - inbox (queue.Queue): The queue to get the item from.
+    - stop (threading.Event): Set when the consumer stops reading from the pipeline.
+
+    Returns:
+    - The item, or END if the pipeline was stopped.
+    """
+    while not stop.is_set():
+        try:
+            return inbox.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            pass
+    return END
+
+
+def read_batches(dataset, batch_size, outbox, slots, stop):
+    """
+    Reader stage: streams the sentences of a dataset and puts them in numbered batches. Every batch takes one of the slots,
+    which the consumer gives back once it has yielded the batch.
+
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    - batch_size (int): The number of sentences (predicate copies) per batch.
+    - outbox (queue.Queue): The queue to put the batches in; blocks while it is full.
+    - slots (threading.Semaphore): The batches that can be in flight; blocks while there is no free slot.
+    - stop (threading.Event): Set when the consumer stops reading from the pipeline.
+    """
+    from get_data import iter_data
+
+    def put_batch(index, batch):
+        while not slots.acquire(timeout=POLL_SECONDS):
+            if stop.is_set():
+                return False
+        return put(outbox, (index, batch), stop)
+
+    batch = []
+    index = 0
+    for sent in iter_data(dataset):
+        batch.append(sent)
+        if len(batch) == batch_size:
+            if not put_batch(index, batch):
+                return
+            batch = []
+            index += 1
+    if batch:
+        put_batch(index, batch)
+
+
+def annotate_batches(inbox, outbox, stop):
+    """
+    spaCy stage: parses the sentences of every batch with nlp.pipe. The predicate copies of a sentence share its text,
+    so every text is only parsed once.
+
+    Parameters:
+    - inbox (queue.Queue): The batches of the reader stage.
+    - outbox (queue.Queue): The queue to put the batches with their spaCy docs in.
+    - stop (threading.Event): Set when the consumer stops reading from the pipeline.
+    """
+    from spacy_model import load_nlp
+
+    nlp = load_nlp()
+    while True:
+        item = get(inbox, stop)
+        if item is END:
+            return
+        if isinstance(item, Exception):
+            raise item
+        index, batch = item
+        texts = list(dict.fromkeys(sent['SENT_TEXT'] for sent in batch))
+        docs = dict(zip(texts, nlp.pipe(texts, batch_size=len(texts))))
+        if not put(outbox, (index, batch, [docs[sent['SENT_TEXT']] for sent in batch]), stop):
+            return
+
+
+def extract_batches(extract, inbox, outbox, preds_dict, embeddings, stop):
+    """
+    Extractor stage: computes the token features of every sentence of a batch from its spaCy doc.
+
+    Parameters:
+    - extract (function): Extracts the features of one sentence, see main.extract_sentence_features.
+    - inbox (queue.Queue): The batches of the spaCy stage.
+    - outbox (queue.Queue): The queue to put the extracted batches in.
+    - preds_dict (dict): The roles and arguments of every predicate frame.
+    - embeddings (str): Path to memory-mapped KeyedVectors embeddings (optional).
+    - stop (threading.Event): Set when the consumer stops reading from the pipeline.
+    """
+    from embedding_features import new_embedding_rows
+
+    while True:
+        item = get(inbox, stop)
+        if item is END:
+            # Let the other workers see the end as well
+            put(inbox, END, stop)
+            return
+        if isinstance(item, Exception):
+            raise item
+        index, batch, docs = item
+        embedding_rows = new_embedding_rows() if embeddings else None
+        results = [extract(sent, preds_dict, embedding_rows, embeddings, doc) for sent, doc in zip(batch, docs)]
+        if not put(outbox, (index, results, embedding_rows), stop):
+            return
+
+
+def start_stage(target, outbox, stop, *args):
+    """
+    Runs a stage in a daemon thread. When the stage is done (or fails), it puts END (or the error) in its outbox.
+
+    Parameters:
+    - target (function): The stage function, called with args and stop.
+    - outbox (queue.Queue): The queue the stage puts its batches in.
+    - stop (threading.Event): Set when the consumer stops reading from the pipeline.
+
+    Returns:
+    - threading.Thread: The started thread.
+    """
+    def run():
+        try:
+            target(*args, stop)
+            put(outbox, END, stop)
+        except Exception as error:
+            put(outbox, error, stop)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def iter_pipelined_features(extract, dataset, preds_dict, embedding_rows=None, embeddings=None, batch_size=64, queue_size=8, workers=2):
+    """
+    Extracts the features of a dataset with the stages connected by bounded queues: a reader thread, a spaCy stage that
+    parses whole batches, and extractor workers. Every stage starts as soon as the first batch reaches it. At most
+    queue_size batches are in flight at a time, from the reader up to the batches the workers finished early and that wait
+    for their turn, however large the corpus is and however slow a single batch is.
+    The sentences are yielded in the order of the dataset. When the consumer stops (or fails), the stages stop as well.
+
+    Parameters:
+    - extract (function): Extracts the features of one sentence from it and its spaCy doc, see main.extract_sentence_features.
+    - dataset (str): The name of the dataset ('train' or 'test').
+    - preds_dict (dict): The roles and arguments of every predicate frame.
+    - embedding_rows (dict): The embedding rows to append the tokens to, in order (optional).
+    - embeddings (str): Path to memory-mapped KeyedVectors embeddings, used with embedding_rows (optional).
+    - batch_size (int): The number of sentences (predicate copies) per batch.
+    - queue_size (int): The maximum number of batches in flight.
+    - workers (int): The number of extractor workers.
+
+    Yields:
+    - tuple: The feature dictionaries, gold labels, argument strings and PropBank arguments of the tokens of a sentence.
+    """
+    sentences = queue.Queue(maxsize=queue_size)
+    annotated = queue.Queue(maxsize=queue_size)
+    extracted = queue.Queue(maxsize=queue_size)
+    slots = threading.Semaphore(queue_size)
+    stop = threading.Event()
+
+    start_stage(read_batches, sentences, stop, dataset, batch_size, sentences, slots)
+    # The spaCy stage ends the annotated queue with a single END, which every worker passes on to the next one
+    start_stage(annotate_batches, annotated, stop, sentences, annotated)
+    for _ in range(workers):
+        start_stage(extract_batches, extracted, stop, extract, annotated, extracted, preds_dict, embeddings)
+
+    # The workers finish batches out of order, keep the early ones until it is their turn
+    pending = {}
+    next_index = 0
+    finished = 0
+    try:
+        while finished < workers:
+            item = extracted.get()
+            if isinstance(item, Exception):
+                raise item
+            if item is END:
+                finished += 1
+                continue
+            index, results, batch_rows = item
+            pending[index] = (results, batch_rows)
+            while next_index in pending:
+                results, batch_rows = pending.pop(next_index)
+                if embedding_rows is not None:
+                    for slot, rows in batch_rows.items():
+                        embedding_rows[slot].extend(rows)
+                yield from results
+                next_index += 1
+                slots.release()
+    finally:
+        stop.set()
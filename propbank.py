@@ -1,5 +1,7 @@
 from nltk.corpus import propbank
+import os
 import pickle
+from corpus_format import corpus_path, load_corpus, predicate_frames
 
 def extract_arguments(ins):
     """
@@ -32,6 +34,28 @@ def fun1(predicate):
         result.append(role.attrib['descr'])
     return result
 
+def roleset_arguments(predicate):
+    """
+    This function finds the numbered arguments that the roleset of a given predicate defines.
+
+    Args:
+        predicate: A predicate for which to find the numbered arguments.
+
+    Returns:
+        A list of numbered arguments, e.g. ['ARG0', 'ARG1', 'ARG2'] for post.01 (poster, posted, posted-to), or an empty
+        list if PropBank has no roleset for the predicate.
+    """
+    try:
+        roleset = propbank.roleset(predicate)
+    except ValueError:
+        return []
+    result = []
+    for role in roleset.findall('roles/role'):
+        # Modifier roles ('M') are not numbered arguments
+        if role.attrib['n'].upper() != 'M':
+            result.append('ARG' + role.attrib['n'].upper())
+    return result
+
 def fun2(pred):
     """
     This function finds the roles and arguments for a given predicate.
@@ -55,38 +79,76 @@ def fun2(pred):
 
 def get_predicates(file_path):
     """
-    This function reads a tsv file and checks the column [10] for predicate.
-    When there is a predicate, it applies the fun2 function.
+    This function reads the predicates of a binary preprocessed corpus (see get_data.convert_data).
+    For every unique predicate, it applies the fun2 function.
 
     Args:
-        file_path: The path to the tsv file.
+        file_path: The path to the corpus directory.
 
     Returns:
         A list of predicates.
     """
     list_of_predicates = {}
-    with open(file_path, 'r', encoding='utf-8') as file:
-        processed_sentences = []
-        for line in file:
-            if line.startswith('# sent_id'):
-                sentence_id = line.split("= ")[1]
-            elif not line.startswith('#') and line.strip() != '':
-                columns = line.strip().split('\t')
-                if len(columns) >= 11 and columns[10] != '_' and (columns[10] not in processed_sentences):
-                    list_of_predicates.update(fun2(columns[10]))
-                    processed_sentences.append(columns[10])
-                else:
-                    continue
-            else:
-                continue
+    for frame in predicate_frames(load_corpus(file_path)):
+        list_of_predicates.update(fun2(frame))
     return list_of_predicates
 
+def add_predicates(file_type, frames):
+    """
+    This function adds the roles and arguments of the given frames to predicates/{file_type}.pkl, like fun2 does for
+    every frame, but with a single pass over the PropBank instances.
+
+    Args:
+        file_type: The dataset the frames are from.
+        frames: The frames to look up.
+    """
+    with open(f'predicates/{file_type}.pkl', 'rb') as f:
+        result = pickle.load(f)
+
+    wanted = set(frames)
+    for instance in propbank.instances():
+        if instance.roleset in wanted:
+            result[instance.roleset] = fun1(instance.roleset) + extract_arguments(instance)
+            wanted.remove(instance.roleset)
+            if not wanted:
+                break
+
+    with open(f'predicates/{file_type}.pkl', 'wb') as f:
+        pickle.dump(result, f)
+
+def save_roleset_arguments(file_type, frames):
+    """
+    This function adds the numbered arguments of the rolesets of the given frames to predicates/{file_type}_arguments.pkl,
+    which constrained decoding uses. Only the frame files are read, not the PropBank instances.
+
+    Args:
+        file_type: The dataset the frames are from.
+        frames: The frames to look up.
+
+    Returns:
+        A dictionary where the key is the frame and the value is the list of numbered arguments of its roleset.
+    """
+    path = f'predicates/{file_type}_arguments.pkl'
+    result = {}
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            result = pickle.load(f)
+
+    for frame in frames:
+        if frame not in result:
+            result[frame] = roleset_arguments(frame)
+
+    with open(path, 'wb') as f:
+        pickle.dump(result, f)
+    return result
+
 def main(file_type):
+    global pb_instances
     # Load all instances from the PropBank corpus
     pb_instances = propbank.instances()
     
     # Call the get_predicates function and store its result
-    result = get_predicates(f'data/converted-{file_type}.conllu')
+    result = get_predicates(corpus_path(file_type))
 
     # Open a file in write-binary mode
     with open(f'predicates/{file_type}.pkl', 'wb') as f:
@@ -106,7 +168,7 @@ if __name__ == "__main__":
     pb_instances = propbank.instances()
     
     # Call the get_predicates function and store its result
-    result = get_predicates(f'data/converted-{file_type}.conllu')
+    result = get_predicates(corpus_path(file_type))
 
     # Open a file in write-binary mode
     with open(f'predicates/{file_type}.pkl', 'wb') as f:
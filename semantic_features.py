@@ -1,10 +1,5 @@
 from get_data import read_data
-from tqdm import tqdm
-import spacy
-from spacy.matcher import Matcher
-import gensim
-
-nlp = spacy.load("en_core_web_sm")
+from spacy_model import load_nlp
 
 # Create pattern to match passive voice use
 passive_rules = [
@@ -23,27 +18,43 @@ active_rules = [
         [{'DEP': 'nsubj'}, {'TAG': 'RB', 'OP': '+'}, {'TAG': 'VBD'}],
     ]
 
-matcher = Matcher(nlp.vocab)  # Init. the matcher with a vocab (note matcher vocab must share same vocab with docs)
-matcher.add('Passive',  passive_rules)  # Add passive rules to matcher
-matcher.add('Active', active_rules)  # Add active rules to matcher
+matcher = None
+
+def load_matcher():
+    """
+    Creates the voice matcher the first time it is needed, together with the spaCy model it shares its vocab with.
+
+    Returns:
+    - spacy.matcher.Matcher: The matcher with the passive and active voice rules.
+    """
+    global matcher
+    if matcher is None:
+        from spacy.matcher import Matcher
 
-# word_embedding_model = gensim.models.KeyedVectors.load_word2vec_format('embeddings/GoogleNews-vectors-negative300.bin', binary=True)   
+        matcher = Matcher(load_nlp().vocab)  # Init. the matcher with a vocab (note matcher vocab must share same vocab with docs)
+        matcher.add('Passive',  passive_rules)  # Add passive rules to matcher
+        matcher.add('Active', active_rules)  # Add active rules to matcher
+    return matcher
 
-def extract_semantic_features(sentence):
+# The word embeddings are extracted by embedding_features.py
+
+def extract_semantic_features(sentence, doc=None):
     """
     Extracts semantic features from a given sentence.
 
     Parameters:
     - sentence (dict): A dictionary representing a sentence containing linguistic annotations and metadata, including the text 
       of the sentence ('SENT_TEXT'), the tokenized features ('FEATURES'), and the predicate token ('PRED_TOKEN').
+    - doc (spacy.tokens.Doc): The sentence text already parsed by spaCy, e.g. in a batch (optional).
 
     Returns:
     - dict: The input sentence dictionary updated with semantic features.
     """
     
-    sent = nlp(sentence['SENT_TEXT'])
+    nlp = load_nlp()
+    sent = nlp(sentence['SENT_TEXT']) if doc is None else doc
     voice = {}
-    for match_id, start, end in matcher(sent):
+    for match_id, start, end in load_matcher()(sent):
         string_id = nlp.vocab.strings[match_id]
         for i in range(start, end):
             voice[sent[i]] = string_id
@@ -74,6 +85,8 @@ def extract_semantic_features(sentence):
     return sentence
 
 if __name__ == "__main__":
+    from tqdm import tqdm
+
     file_type = 'train'
     sentences = read_data(file_type)
     features = []
@@ -0,0 +1,358 @@
+import os
+import glob
+import json
+import pickle
+import shutil
+import argparse
+import zlib
+import numpy as np
+from corpus_format import file_sha256, SHARD_DIR
+
+# Size of the hashing space, used when no frozen vectorizer is given
+DEFAULT_HASH_FEATURES = 2 ** 18
+
+
+def shard_name(dataset, index, n_shards):
+    """
+    Gets the dataset name of a shard, which is used like 'train' or 'test' for its CoNLL-U file, corpus and predicates.
+    The CoNLL-U file and corpus of a shard are kept in SHARD_DIR (see get_data.find_data and corpus_format.corpus_path).
+
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    - index (int): The index of the shard.
+    - n_shards (int): The number of shards.
+
+    Returns:
+    - str: The name of the shard, e.g. 'train.shard-003-of-008'.
+    """
+    return f'{dataset}.shard-{index:03d}-of-{n_shards:03d}'
+
+
+def manifest_path(dataset):
+    """
+    Gets the path of the shard manifest of a dataset.
+
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+
+    Returns:
+    - str: The path of the manifest.
+    """
+    return os.path.join(SHARD_DIR, f'{dataset}-manifest.json')
+
+
+def shard_output_path(name):
+    """
+    Gets the path of the extracted features of a shard.
+
+    Parameters:
+    - name (str): The name of the shard, see shard_name.
+
+    Returns:
+    - str: The path of the features.
+    """
+    return os.path.join(SHARD_DIR, f'{name}.pkl')
+
+
+def document_shard(doc_id, n_shards):
+    """
+    Assigns a document to a shard. A checksum of the document ID is used instead of hash(), which differs between Python
+    processes, so every machine assigns the same documents to the same shards.
+
+    Parameters:
+    - doc_id (str): The ID of the document ('# newdoc id').
+    - n_shards (int): The number of shards.
+
+    Returns:
+    - int: The index of the shard.
+    """
+    return zlib.crc32(doc_id.encode('utf-8')) % n_shards
+
+
+def split_dataset(dataset, n_shards, vectorizer_path=None, n_features=DEFAULT_HASH_FEATURES, embeddings=None):
+    """
+    Splits the CoNLL-U file of a dataset by document ('# newdoc id') into shards, and writes the manifest that the shard
+    workers and the merge step check against. Every shard is a CoNLL-U file of its own ('{SHARD_DIR}/{shard}.conllu'),
+    so its corpus and predicates are prepared like those of any dataset. The manifest also records the order of the
+    documents, so the merge step can restore the order of the original file. All files of an earlier split of the
+    dataset are removed first, whatever its number of shards.
+
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    - n_shards (int): The number of shards.
+    - vectorizer_path (str): Path to the pickled (vectorizer, pred_vectorizer) that every shard uses frozen, e.g.
+      'features/vectorizers.pkl' of an earlier run (optional, default: a hashing space).
+    - n_features (int): The size of the hashing space, used without vectorizer_path.
+    - embeddings (str): Path to memory-mapped KeyedVectors embeddings, to also add lemma and predicate embeddings (optional).
+
+    Returns:
+    - dict: The manifest.
+    """
+    from get_data import find_data
+
+    source = find_data(dataset)
+
+    # The CoNLL-U files, corpora, predicates and features of an earlier split are stale now
+    for path in (glob.glob(os.path.join(SHARD_DIR, f'{dataset}.shard-*')) + glob.glob(f'predicates/{dataset}.shard-*')):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+    names = [shard_name(dataset, i, n_shards) for i in range(n_shards)]
+    paths = [find_data(name) for name in names]
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    files = [open(path, 'w', encoding='utf-8') for path in paths]
+    sentences = [0] * n_shards
+    # Consecutive sentences of the same shard, in the order of the original file
+    segments = []
+
+    try:
+        shard = document_shard('', n_shards)
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('# newdoc id'):
+                    shard = document_shard(line.rstrip('\n').split("= ")[1], n_shards)
+                elif line.startswith('# sent_id'):
+                    sentences[shard] += 1
+                    if segments and segments[-1][0] == shard:
+                        segments[-1][1] += 1
+                    else:
+                        segments.append([shard, 1])
+                files[shard].write(line)
+    finally:
+        for shard_file in files:
+            shard_file.close()
+
+    if vectorizer_path:
+        vectorizer = {'TYPE': 'frozen', 'PATH': vectorizer_path, 'SHA256': file_sha256(vectorizer_path)}
+    else:
+        vectorizer = {'TYPE': 'hashing', 'N_FEATURES': n_features}
+
+    manifest = {
+        'dataset': dataset,
+        'source': source,
+        'source_sha256': file_sha256(source),
+        'vectorizer': vectorizer,
+        'embeddings': embeddings,
+        'shards': [{'name': name, 'conllu': path, 'sha256': file_sha256(path), 'sentences': count}
+                   for name, path, count in zip(names, paths, sentences)],
+        'segments': segments,
+    }
+    with open(manifest_path(dataset), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def load_manifest(dataset):
+    """
+    Loads the shard manifest of a dataset.
+
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+
+    Returns:
+    - dict: The manifest, see split_dataset.
+    """
+    if not os.path.exists(manifest_path(dataset)):
+        raise FileNotFoundError(f'No shard manifest found in {manifest_path(dataset)}, split the {dataset} dataset first.')
+    with open(manifest_path(dataset), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_vectorizers(manifest):
+    """
+    Loads the vectorizers that every shard of a dataset uses. None of them is fitted on a shard: a frozen vectorizer only
+    transforms (unseen feature values are left out), and a hashing space needs no fitting.
+
+    Parameters:
+    - manifest (dict): The shard manifest, see split_dataset.
+
+    Returns:
+    - tuple: The token feature vectorizer (DictVectorizer, vocabulary of the encoded mode or FeatureHasher) and the predicate
+      vectorizer (CountVectorizer or HashingVectorizer).
+    """
+    spec = manifest['vectorizer']
+    if spec['TYPE'] == 'frozen':
+        if file_sha256(spec['PATH']) != spec['SHA256']:
+            raise ValueError(f"{spec['PATH']} changed after the {manifest['dataset']} dataset was split, split it again.")
+        with open(spec['PATH'], 'rb') as f:
+            return pickle.load(f)
+
+    from sklearn.feature_extraction import FeatureHasher
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return (FeatureHasher(n_features=spec['N_FEATURES'], alternate_sign=False),
+            HashingVectorizer(n_features=spec['N_FEATURES'], alternate_sign=False, norm=None))
+
+
+def extract_shard(dataset, index):
+    """
+    Extracts the features of one shard, independently of all other shards, and writes them to the shared shard directory.
+    The output is written to a temporary file first and then renamed, so the merge step never sees a partial shard.
+
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    - index (int): The index of the shard.
+
+    Returns:
+    - str: The path of the extracted features.
+    """
+    from main import extract_features
+    from corpus_format import corpus_path, load_corpus
+
+    manifest = load_manifest(dataset)
+    shard = manifest['shards'][index]
+    if file_sha256(shard['conllu']) != shard['sha256']:
+        raise ValueError(f"{shard['conllu']} does not match the manifest, split the {dataset} dataset again.")
+
+    if shard['sentences'] == 0:
+        # Small datasets can have fewer documents than shards
+        feature_matrix, golds, sentence_rows = None, [], np.array([], dtype=np.int64)
+    else:
+        vectorizer, pred_vectorizer = load_vectorizers(manifest)
+        # The shard name is not 'train', so the vectorizers are only applied
+        feature_matrix, golds, _, _ = extract_features(shard['name'], vectorizer, pred_vectorizer, manifest['embeddings'])
+        feature_matrix = feature_matrix.tocsr()
+
+        # The number of rows of every sentence, to put the documents back in their original order when merging
+        corpus = load_corpus(corpus_path(shard['name']))
+        sentence_rows = np.bincount(corpus['predicate_sentence'], weights=np.diff(corpus['role_offsets']),
+                                    minlength=corpus['META']['sentences']).astype(np.int64)
+
+    output = {
+        'FEATURES': feature_matrix,
+        'LABELS': golds,
+        'SENTENCE_ROWS': sentence_rows,
+        'SHA256': shard['sha256'],
+        'VECTORIZER': manifest['vectorizer'],
+    }
+    output_path = shard_output_path(shard['name'])
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    with open(output_path + '.tmp', 'wb') as f:
+        pickle.dump(output, f)
+    os.replace(output_path + '.tmp', output_path)
+
+    return output_path
+
+
+def merge_shards(dataset):
+    """
+    Checks the extracted features of every shard against the manifest and concatenates them, in the order of the original
+    CoNLL-U file, into the feature matrix and labels that main.py trains and evaluates on.
+
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+
+    Returns:
+    - tuple: The feature matrix and the gold labels of the dataset.
+    """
+    from scipy.sparse import vstack
+
+    manifest = load_manifest(dataset)
+    outputs = []
+    for shard in manifest['shards']:
+        if not os.path.exists(shard_output_path(shard['name'])):
+            raise FileNotFoundError(f"Shard {shard['name']} has not been extracted yet.")
+        with open(shard_output_path(shard['name']), 'rb') as f:
+            output = pickle.load(f)
+        if output['SHA256'] != shard['sha256'] or output['VECTORIZER'] != manifest['vectorizer']:
+            raise ValueError(f"Shard {shard['name']} was extracted from another split or vectorizer, extract it again.")
+        if len(output['SENTENCE_ROWS']) != shard['sentences'] or output['SENTENCE_ROWS'].sum() != len(output['LABELS']):
+            raise ValueError(f"Shard {shard['name']} does not have the sentences of the manifest, extract it again.")
+        outputs.append(output)
+
+    matrices = [output['FEATURES'] for output in outputs if output['FEATURES'] is not None]
+    if len({matrix.shape[1] for matrix in matrices}) > 1:
+        raise ValueError('The shards have different numbers of columns, they were not extracted with the same vectorizer.')
+
+    # Where the rows of every sentence start in the concatenated shards
+    shard_starts = np.cumsum([0] + [len(output['LABELS']) for output in outputs])
+    sentence_starts = [shard_starts[i] + np.concatenate([[0], np.cumsum(output['SENTENCE_ROWS'])])
+                       for i, output in enumerate(outputs)]
+
+    # Take the segments of every shard in the order of the original file
+    next_sentence = [0] * len(outputs)
+    order = []
+    for shard, n_sentences in manifest['segments']:
+        first = next_sentence[shard]
+        order.append(np.arange(sentence_starts[shard][first], sentence_starts[shard][first + n_sentences]))
+        next_sentence[shard] += n_sentences
+    order = np.concatenate(order) if order else np.array([], dtype=np.int64)
+
+    feature_matrix = vstack(matrices, format='csr')[order]
+    labels = [label for output in outputs for label in output['LABELS']]
+    return feature_matrix, [labels[i] for i in order]
+
+
+def write_merged_features(dataset):
+    """
+    Merges the shards of a dataset and saves the features like main.py does, together with the shared vectorizers.
+
+    Parameters:
+    - dataset (str): The name of the dataset ('train' or 'test').
+    """
+    from ablation import column_groups
+
+    feature_matrix, labels = merge_shards(dataset)
+    manifest = load_manifest(dataset)
+    vectorizer, pred_vectorizer = load_vectorizers(manifest)
+
+    os.makedirs('features', exist_ok=True)
+    with open(f'features/{dataset}.pkl', 'wb') as f:
+        pickle.dump(feature_matrix, f)
+    with open(f'features/{dataset}_labels.pkl', 'wb') as f:
+        pickle.dump(labels, f)
+    with open('features/vectorizers.pkl', 'wb') as f:
+        pickle.dump((vectorizer, pred_vectorizer), f)
+
+    # Hashed columns have no names, so only a frozen vectorizer supports the ablation study
+    if manifest['vectorizer']['TYPE'] == 'frozen':
+        from main import get_feature_names
+
+        with open('features/column_groups.pkl', 'wb') as f:
+            pickle.dump(column_groups(get_feature_names(vectorizer, manifest['embeddings'])), f)
+    elif os.path.exists('features/column_groups.pkl'):
+        os.remove('features/column_groups.pkl')
+
+    print(f"\n Merged {len(manifest['shards'])} shards of the {dataset} dataset ({feature_matrix.shape[0]} tokens, "
+          f"{feature_matrix.shape[1]} columns) into features/{dataset}.pkl")
+
+
+if __name__ == "__main__":
+    from embedding_features import EMBEDDINGS_PATH
+
+    parser = argparse.ArgumentParser(description='Sharded feature extraction, to run on several machines of a batch cluster')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    split_parser = commands.add_parser('split', help='split datasets by document into shards and write their manifests')
+    split_parser.add_argument('datasets', nargs='+', help='datasets to split, e.g. train test')
+    split_parser.add_argument('--shards', type=int, required=True, help='number of shards per dataset')
+    split_parser.add_argument('--vectorizer', metavar='PATH',
+                              help='pickled (vectorizer, pred_vectorizer) to use frozen, e.g. features/vectorizers.pkl of an earlier run '
+                                   '(default: a hashing space)')
+    split_parser.add_argument('--n-features', type=int, default=DEFAULT_HASH_FEATURES,
+                              help=f'size of the hashing space (default: {DEFAULT_HASH_FEATURES})')
+    split_parser.add_argument('--embeddings', nargs='?', const=EMBEDDINGS_PATH, default=None, metavar='PATH',
+                              help=f'add lemma and predicate embeddings from memory-mapped KeyedVectors (default: {EMBEDDINGS_PATH})')
+
+    extract_parser = commands.add_parser('extract', help='extract the features of one shard')
+    extract_parser.add_argument('dataset', help='dataset of the shard, e.g. train')
+    extract_parser.add_argument('index', type=int, help='index of the shard')
+
+    merge_parser = commands.add_parser('merge', help='check the extracted shards against the manifests and merge them')
+    merge_parser.add_argument('datasets', nargs='+', help='datasets to merge, e.g. train test')
+
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        for dataset in args.datasets:
+            manifest = split_dataset(dataset, args.shards, args.vectorizer, args.n_features, args.embeddings)
+            sizes = ', '.join(str(shard['sentences']) for shard in manifest['shards'])
+            print(f"Split the {dataset} dataset into {args.shards} shards ({sizes} sentences), see {manifest_path(dataset)}")
+    elif args.command == 'extract':
+        print(f"The features are saved in {extract_shard(args.dataset, args.index)}")
+    else:
+        for dataset in args.datasets:
+            write_merged_features(dataset)
@@ -0,0 +1,18 @@
+# The spaCy model is shared by the NER and semantic feature extractors, and only loaded when a sentence is first processed
+nlp = None
+
+
+def load_nlp():
+    """
+    Loads the small English spaCy model the first time it is needed, so importing the feature extractors stays fast.
+
+    Returns:
+    - spacy.Language: The loaded model, shared by all callers.
+    """
+    global nlp
+    if nlp is None:
+        import spacy
+
+        # Load the small English model
+        nlp = spacy.load("en_core_web_sm")
+    return nlp
@@ -0,0 +1,305 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from get_data import iter_conllu, expand_predicates
+from corpus_format import load_corpus
+
+PREDICATE_LABELS = ['V', 'C-V', 'R-V']
+
+
+def collect_statistics(file_path):
+    """
+    Collect statistics of the raw and the converted (predicate-expanded) data of a CoNLL-U file in a single streaming pass.
+    The converted data is derived with the same conversion as get_data.read_data, so no converted file needs to be read.
+
+    Binary preprocessed corpora (see get_data.convert_data) are read with collect_corpus_statistics instead.
+
+    Parameters:
+    - file_path (str): Path to the CoNLL-U formatted file, or to a binary corpus directory.
+
+    Returns:
+    - dict: A dictionary with the file path and a 'raw' and 'converted' section, each containing the sentence, token,
+      predicate and argument counts, and the label distributions.
+    """
+    if os.path.isdir(file_path):
+        return collect_corpus_statistics(file_path)
+
+    raw = {'sentences': 0, 'tokens': 0, 'sentences_without_predicate': 0, 'predicates': 0, 'arguments': 0,
+           'predicate_counts': Counter(), 'label_counts': Counter()}
+    converted = {'sentences': 0, 'tokens': 0, 'sentences_without_predicate': 0, 'predicates': 0, 'arguments': 0,
+                 'predicate_counts': Counter(), 'label_counts': Counter()}
+
+    for sentence in iter_conllu(file_path):
+        raw['sentences'] += 1
+        raw['tokens'] += len(sentence['ROWS'])
+        has_predicate = False
+        for columns in sentence['ROWS']:
+            if len(columns) > 10 and columns[10] != '_':
+                has_predicate = True
+                raw['predicates'] += 1
+                raw['predicate_counts'][columns[10]] += 1
+            # Collect arguments from columns 12 onwards
+            for argument in columns[11:]:
+                if argument != '_' and argument not in PREDICATE_LABELS:
+                    raw['arguments'] += 1
+                    raw['label_counts'][argument] += 1
+        if not has_predicate:
+            raw['sentences_without_predicate'] += 1
+
+        for pred_sentence in expand_predicates(sentence):
+            converted['sentences'] += 1
+            converted['tokens'] += len(pred_sentence['FEATURES'])
+            if 'PRED_FRAME' in pred_sentence:
+                converted['predicates'] += 1
+                converted['predicate_counts'][pred_sentence['PRED_FRAME']] += 1
+            else:
+                converted['sentences_without_predicate'] += 1
+            for token in pred_sentence['FEATURES']:
+                # The converted data keeps '_' as the label of non-arguments, which is a class for the model
+                converted['label_counts'][token['ROLE']] += 1
+                if token['ROLE'] != '_':
+                    converted['arguments'] += 1
+
+    return {'file': file_path, 'raw': summarize(raw), 'converted': summarize(converted)}
+
+
+def count_ids(ids, strings):
+    """
+    Count the occurrences of string IDs of a binary corpus.
+
+    Parameters:
+    - ids (numpy.ndarray): String IDs.
+    - strings (list of str): The string table of the corpus.
+
+    Returns:
+    - Counter: The number of occurrences of each string.
+    """
+    unique_ids, counts = np.unique(ids, return_counts=True)
+    return Counter({strings[i]: int(count) for i, count in zip(unique_ids, counts)})
+
+
+def collect_corpus_statistics(path):
+    """
+    Collect the same statistics as collect_statistics from a binary preprocessed corpus. Only the predicate and label columns
+    are counted, with numpy, so no text is parsed and no token dictionaries are built.
+
+    Parameters:
+    - path (str): Path to the corpus directory.
+
+    Returns:
+    - dict: A dictionary with the corpus path and a 'raw' and 'converted' section, see collect_statistics.
+    """
+    corpus = load_corpus(path)
+    strings = corpus['STRINGS']
+    excluded = [strings.index(label) for label in ['_'] + PREDICATE_LABELS if label in strings]
+
+    pred_column = np.asarray(corpus['token_pred_column'])
+    is_predicate = ~np.isin(pred_column, excluded[:1])
+    tokens_per_sentence = np.diff(corpus['token_offsets'])
+    sentence_of_token = np.repeat(np.arange(len(tokens_per_sentence)), tokens_per_sentence)
+    predicates_per_sentence = np.bincount(sentence_of_token, weights=is_predicate, minlength=len(tokens_per_sentence))
+    role = np.asarray(corpus['role'])
+    frames = np.asarray(corpus['predicate_pred_frame'])
+
+    raw = {
+        'sentences': corpus['META']['sentences'],
+        'tokens': int(np.sum(corpus['sentence_raw_tokens'])),
+        'sentences_without_predicate': int(np.sum(predicates_per_sentence == 0)),
+        'predicates': int(np.sum(is_predicate)),
+        'predicate_counts': count_ids(pred_column[is_predicate], strings),
+        'label_counts': count_ids(role[~np.isin(role, excluded)], strings),
+    }
+    raw['arguments'] = sum(raw['label_counts'].values())
+    converted = {
+        'sentences': corpus['META']['predicates'],
+        'tokens': len(role),
+        'sentences_without_predicate': int(np.sum(frames == -1)),
+        'predicates': int(np.sum(frames != -1)),
+        'predicate_counts': count_ids(frames[frames != -1], strings),
+        'label_counts': count_ids(role, strings),
+    }
+    converted['arguments'] = converted['tokens'] - converted['label_counts'].get('_', 0)
+
+    return {'file': path, 'raw': summarize(raw), 'converted': summarize(converted)}
+
+
+def summarize(counts):
+    """
+    Add the derived statistics (percentages, averages and numbers of unique values) to the collected counts.
+
+    Parameters:
+    - counts (dict): The counts of one section, as collected by collect_statistics.
+
+    Returns:
+    - dict: The counts together with the derived statistics, with label distributions sorted by decreasing frequency.
+    """
+    num_sentences = counts['sentences']
+    num_sentences_with_predicate = num_sentences - counts['sentences_without_predicate']
+    return {
+        'sentences': num_sentences,
+        'tokens': counts['tokens'],
+        'sentences_without_predicate': counts['sentences_without_predicate'],
+        'sentences_with_predicate': num_sentences_with_predicate,
+        'percentage_without_predicate': counts['sentences_without_predicate'] / num_sentences * 100 if num_sentences else 0.0,
+        'percentage_with_predicate': num_sentences_with_predicate / num_sentences * 100 if num_sentences else 0.0,
+        'average_tokens_per_sentence': counts['tokens'] / num_sentences if num_sentences else 0.0,
+        'predicates': counts['predicates'],
+        'unique_predicates': len(counts['predicate_counts']),
+        'arguments': counts['arguments'],
+        'unique_arguments': len([label for label in counts['label_counts'] if label != '_']),
+        'unique_labels': len(counts['label_counts']),
+        'label_distribution': dict(counts['label_counts'].most_common()),
+    }
+
+
+def analyze_files(file_paths, workers=None):
+    """
+    Collect the statistics of several files in parallel, one process per file.
+
+    Parameters:
+    - file_paths (list of str): Paths to the CoNLL-U formatted files.
+    - workers (int): Maximum number of worker processes (default: number of CPUs).
+
+    Returns:
+    - list of dict: The statistics of each file, in the order of file_paths.
+    """
+    if len(file_paths) <= 1 or workers == 1:
+        return [collect_statistics(file_path) for file_path in file_paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(collect_statistics, file_paths))
+
+
+def find_files(paths, prefix='en_ewt-up', extension='.conllu'):
+    """
+    Expand the given files and directories into a sorted list of CoNLL-U files.
+
+    Parameters:
+    - paths (list of str): Files and binary corpora, or directories whose files starting with prefix are analyzed.
+    - prefix (str): Filename prefix of the files to analyze in directories.
+    - extension (str): Filename extension of the files to analyze in directories ('.srl' for binary corpora).
+
+    Returns:
+    - list of str: Paths to the CoNLL-U formatted files.
+    """
+    file_paths = []
+    for path in paths:
+        if os.path.isdir(path) and not path.rstrip('/').endswith('.srl'):
+            file_paths.extend(os.path.join(path, filename) for filename in sorted(os.listdir(path))
+                              if filename.startswith(prefix) and filename.endswith(extension))
+        else:
+            file_paths.append(path)
+    return file_paths
+
+
+def write_json(results, output):
+    """
+    Write the statistics as JSON.
+
+    Parameters:
+    - results (list of dict): The statistics of each file.
+    - output: A writable text file.
+    """
+    json.dump(results, output, indent=2)
+    output.write('\n')
+
+
+def write_csv(results, output):
+    """
+    Write the statistics as CSV in long format, with one row per file, section and statistic.
+    Label distributions are written as 'label:<LABEL>' statistics.
+
+    Parameters:
+    - results (list of dict): The statistics of each file.
+    - output: A writable text file.
+    """
+    writer = csv.writer(output)
+    writer.writerow(['file', 'section', 'statistic', 'value'])
+    for result in results:
+        for section in ['raw', 'converted']:
+            for statistic, value in result[section].items():
+                if statistic == 'label_distribution':
+                    for label, count in value.items():
+                        writer.writerow([result['file'], section, f'label:{label}', count])
+                else:
+                    writer.writerow([result['file'], section, statistic, value])
+
+
+def plot_label_distribution(result, section, output_dir):
+    """
+    Plot the label distribution of one section of a file and save it as a PNG image, without opening a window.
+    C- and R- prefixes are removed from the labels to reduce the number of categories in the plot.
+
+    Parameters:
+    - result (dict): The statistics of one file.
+    - section (str): 'raw' or 'converted'.
+    - output_dir (str): Directory to save the image in.
+
+    Returns:
+    - str: Path to the saved image.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    label_counts = Counter()
+    for label, count in result[section]['label_distribution'].items():
+        if label != '_':
+            label_counts[label.removeprefix('C-').removeprefix('R-')] += count
+    if not label_counts:
+        return None
+    arguments, counts = zip(*label_counts.most_common())
+
+    plt.figure(figsize=(12, 8))
+    colors = plt.cm.viridis(np.linspace(0, 1, len(arguments)))
+    bars = plt.bar(arguments, counts, color=colors)
+
+    # Annotating each bar with its count
+    for bar, count in zip(bars, counts):
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width() / 2., height, f'{count}', ha='center', va='bottom')
+
+    name = os.path.splitext(os.path.basename(result['file']))[0]
+    plt.title(f'Argument Distribution in {name} ({section})')
+    plt.xticks(rotation=90)
+    plt.ylabel('Frequency')
+    plt.xlabel('Argument Types')
+    plt.tight_layout()
+
+    os.makedirs(output_dir, exist_ok=True)
+    image_path = os.path.join(output_dir, f'{name}-{section}-arguments.png')
+    plt.savefig(image_path)
+    plt.close()
+    return image_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Raw and converted corpus statistics of CoNLL-U files')
+    parser.add_argument('paths', nargs='*', default=[os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')],
+                        help='CoNLL-U files, or directories with en_ewt-up*.conllu files (default: data/)')
+    parser.add_argument('--format', choices=['json', 'csv'], default='json', help='output format')
+    parser.add_argument('--output', help='output file (default: standard output)')
+    parser.add_argument('--workers', type=int, default=None, help='number of files analyzed in parallel')
+    parser.add_argument('--plot', metavar='DIR', help='also save label distribution plots to this directory')
+    args = parser.parse_args()
+
+    results = analyze_files(find_files(args.paths), args.workers)
+
+    write = write_json if args.format == 'json' else write_csv
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            write(results, f)
+    else:
+        write(results, sys.stdout)
+
+    if args.plot:
+        for result in results:
+            for section in ['raw', 'converted']:
+                plot_label_distribution(result, section, args.plot)